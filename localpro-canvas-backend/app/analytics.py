@@ -0,0 +1,122 @@
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+from .database import db
+from .tasks import PeriodicTask
+
+load_dotenv()
+
+# View analytics configuration
+ANALYTICS_ROLLUP_INTERVAL_SECONDS = float(os.getenv("ANALYTICS_ROLLUP_INTERVAL_SECONDS", 300))
+ANALYTICS_HOURLY_RETENTION_DAYS = int(os.getenv("ANALYTICS_HOURLY_RETENTION_DAYS", 14))
+ANALYTICS_DAILY_RETENTION_DAYS = int(os.getenv("ANALYTICS_DAILY_RETENTION_DAYS", 400))
+ANALYTICS_ROLLUP_BATCH_SIZE = 1000
+
+HOUR = "hour"
+DAY = "day"
+
+def hour_start(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def day_start(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def hourly_increments(counts: Dict[Tuple[str, datetime], int]) -> List[UpdateOne]:
+    """Upserts adding buffered views to their hourly bucket documents"""
+    return [
+        UpdateOne(
+            {"unique_identifier": unique_identifier, "granularity": HOUR, "start": start},
+            {"$inc": {"views": count}},
+            upsert=True
+        )
+        for (unique_identifier, start), count in counts.items()
+    ]
+
+async def read_buckets(unique_identifier: str, granularity: str, periods: int) -> List[dict]:
+    """
+    View counts for the last `periods` hours or days, oldest first.
+
+    Reads one small document per period that had views and fills the rest
+    with zeros.
+    """
+    step = timedelta(hours=1) if granularity == HOUR else timedelta(days=1)
+    now = datetime.utcnow()
+    current = hour_start(now) if granularity == HOUR else day_start(now)
+    first = current - step * (periods - 1)
+
+    cursor = db.db.portfolio_view_buckets.find(
+        {"unique_identifier": unique_identifier, "granularity": granularity, "start": {"$gte": first}},
+        {"_id": 0, "start": 1, "views": 1}
+    )
+    stored = {bucket["start"]: bucket["views"] async for bucket in cursor}
+    return [
+        {"start": first + step * index, "views": stored.get(first + step * index, 0)}
+        for index in range(periods)
+    ]
+
+class ViewRollups(PeriodicTask):
+    """Roll hourly view buckets up into daily ones and drop buckets past retention"""
+
+    def __init__(self, interval: float = ANALYTICS_ROLLUP_INTERVAL_SECONDS):
+        super().__init__(interval)
+        self.last_run: Optional[datetime] = None
+
+    async def rollup(self):
+        """
+        Recompute the daily buckets of yesterday and today from their hourly buckets.
+
+        Daily totals are $set, not $inc, so a rerun after a partial failure
+        or on several workers at once gives the same result.
+        """
+        since = day_start(datetime.utcnow()) - timedelta(days=1)
+        pipeline = [
+            {"$match": {"granularity": HOUR, "start": {"$gte": since}}},
+            {"$group": {
+                "_id": {
+                    "unique_identifier": "$unique_identifier",
+                    "day": {"$dateFromParts": {
+                        "year": {"$year": "$start"},
+                        "month": {"$month": "$start"},
+                        "day": {"$dayOfMonth": "$start"}
+                    }}
+                },
+                "views": {"$sum": "$views"}
+            }},
+        ]
+        operations = []
+        async for row in db.db.portfolio_view_buckets.aggregate(pipeline):
+            operations.append(UpdateOne(
+                {"unique_identifier": row["_id"]["unique_identifier"], "granularity": DAY, "start": row["_id"]["day"]},
+                {"$set": {"views": row["views"]}},
+                upsert=True
+            ))
+            if len(operations) >= ANALYTICS_ROLLUP_BATCH_SIZE:
+                await db.db.portfolio_view_buckets.bulk_write(operations, ordered=False)
+                operations = []
+        if operations:
+            await db.db.portfolio_view_buckets.bulk_write(operations, ordered=False)
+
+    async def compact(self):
+        """Delete hourly and daily buckets older than their retention"""
+        now = datetime.utcnow()
+        await db.db.portfolio_view_buckets.delete_many({
+            "granularity": HOUR,
+            "start": {"$lt": hour_start(now) - timedelta(days=ANALYTICS_HOURLY_RETENTION_DAYS)}
+        })
+        await db.db.portfolio_view_buckets.delete_many({
+            "granularity": DAY,
+            "start": {"$lt": day_start(now) - timedelta(days=ANALYTICS_DAILY_RETENTION_DAYS)}
+        })
+
+    async def run_once(self):
+        try:
+            await self.rollup()
+            await self.compact()
+            self.last_run = datetime.utcnow()
+        except Exception as e:
+            print(f"Failed to roll up view analytics: {e}")
+
+# View rollups instance
+view_rollups = ViewRollups()
@@ -1,3 +1,6 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -6,8 +9,9 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 import os
 from dotenv import load_dotenv
+from .cache import TTLCache
 from .database import db
-from .models import User, TokenData
+from .models import Principal, PRINCIPAL_PROJECTION, TokenData
 
 load_dotenv()
 
@@ -22,6 +26,20 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
+# Password hashing executor configuration ("thread", "process" or "inline")
+PASSWORD_EXECUTOR = os.getenv("PASSWORD_EXECUTOR", "thread")
+PASSWORD_EXECUTOR_WORKERS = int(os.getenv("PASSWORD_EXECUTOR_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_EXECUTOR_MAX_QUEUE = int(os.getenv("PASSWORD_EXECUTOR_MAX_QUEUE", 64))
+
+# Principal cache configuration; entries are only dropped by expiry, so a change
+# to a user's role or is_active flag takes effect within the TTL
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 5))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", 10000))
+
+# Decoded JWT payloads keyed by token, and authenticated users keyed by user_id
+token_cache = TTLCache(PRINCIPAL_CACHE_MAX_ENTRIES, PRINCIPAL_CACHE_TTL_SECONDS)
+principal_cache = TTLCache(PRINCIPAL_CACHE_MAX_ENTRIES, PRINCIPAL_CACHE_TTL_SECONDS)
+
 def verify_password(plain_password, hashed_password):
     """Verify password"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -30,14 +48,77 @@ def get_password_hash(password):
     """Hash password"""
     return pwd_context.hash(password)
 
+class PasswordExecutor:
+    """Run bcrypt work off the event loop with a bounded backlog"""
+
+    def __init__(self, kind: str = PASSWORD_EXECUTOR, workers: int = PASSWORD_EXECUTOR_WORKERS,
+                 max_queue: int = PASSWORD_EXECUTOR_MAX_QUEUE):
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor: Optional[Executor] = None
+        self.pending = 0
+        self.rejected = 0
+
+    def start(self):
+        """Create the worker pool"""
+        if self.executor is not None or self.kind == "inline":
+            return
+        if self.kind == "process":
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password"
+            )
+
+    def shutdown(self):
+        """Wait for running jobs and release the worker pool"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    async def run(self, func, *args):
+        """Run a password function in the pool, rejecting work once the backlog is full"""
+        if self.executor is None:
+            return func(*args)
+
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent authentication requests, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+# Password executor instance
+password_executor = PasswordExecutor()
+
+async def verify_password_async(plain_password, hashed_password):
+    """Verify password in the password executor"""
+    return await password_executor.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    """Hash password in the password executor"""
+    return await password_executor.run(get_password_hash, password)
+
 async def authenticate_user(email: str, password: str):
     """Authenticate user"""
-    user = await db.db.users.find_one({"email": email})
+    user = await db.db.users.find_one(
+        {"email": email},
+        {**PRINCIPAL_PROJECTION, "hashed_password": 1}
+    )
     if not user:
         return False
-    if not verify_password(password, user["hashed_password"]):
+    if not await verify_password_async(password, user["hashed_password"]):
         return False
-    return User(**user)
+    return Principal(**user)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT token"""
@@ -59,38 +140,41 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        user_id: str = payload.get("user_id")
-        
-        if email is None or user_id is None:
+    token_data = token_cache.get(token)
+    if token_data is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            email: str = payload.get("sub")
+            user_id: str = payload.get("user_id")
+            
+            if email is None or user_id is None:
+                raise credentials_exception
+            
+            token_data = TokenData(email=email, user_id=user_id)
+        except JWTError:
             raise credentials_exception
         
-        token_data = TokenData(email=email, user_id=user_id)
-    except JWTError:
-        raise credentials_exception
+        # Never keep a decoded token past its own expiry
+        expires_at = None
+        if payload.get("exp") is not None:
+            expires_at = time.monotonic() + (payload["exp"] - time.time())
+        token_cache.set(token, token_data, expires_at=expires_at)
+    
+    user = principal_cache.get(token_data.user_id)
+    if user is not None and user.email == token_data.email:
+        return user
     
-    user = await db.db.users.find_one({"email": token_data.email})
+    # Only the slim principal; endpoints load heavy fields themselves
+    user = await db.db.users.find_one({"email": token_data.email}, PRINCIPAL_PROJECTION)
     if user is None:
         raise credentials_exception
     
-    return User(**user)
+    user = Principal(**user)
+    principal_cache.set(token_data.user_id, user)
+    return user
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)):
     """Get current active user"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
-
-def generate_unique_identifier(name: str, user_id: str) -> str:
-    """Generate unique identifier for portfolio"""
-    import hashlib
-    import time
-    
-    # Create a hash from name + user_id + timestamp
-    base_string = f"{name.lower().replace(' ', '-')}-{user_id}-{int(time.time())}"
-    hash_object = hashlib.md5(base_string.encode())
-    short_hash = hash_object.hexdigest()[:8]
-    
-    return f"{name.lower().replace(' ', '-')}-{short_hash}"
@@ -0,0 +1,189 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Public portfolio cache configuration
+PORTFOLIO_CACHE_MAX_BYTES = int(os.getenv("PORTFOLIO_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+PORTFOLIO_CACHE_TTL_SECONDS = float(os.getenv("PORTFOLIO_CACHE_TTL_SECONDS", 300))
+# Recently invalidated keys remembered for in-flight loads; older ones fail every load started before them
+PORTFOLIO_CACHE_MAX_TOMBSTONES = 10000
+
+class PortfolioCache:
+    """Bounded LRU cache with TTL for published portfolio payloads"""
+
+    def __init__(self, max_bytes: int = PORTFOLIO_CACHE_MAX_BYTES,
+                 ttl_seconds: float = PORTFOLIO_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, size_bytes, value), least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self.size_bytes = 0
+        # Bumped on every invalidation; a load only stores its value if its key
+        # was not invalidated after the generation the load started at
+        self._generation = 0
+        # key -> generation it was last invalidated at, oldest first
+        self._tombstones: "OrderedDict[str, int]" = OrderedDict()
+        # Loads started before this generation are refused, e.g. after clear()
+        self._floor = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.ttl_seconds > 0
+
+    def generation(self) -> int:
+        """Token to pass to set() for a value about to be loaded"""
+        return self._generation
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached value, or None on a miss"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, size, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Dict[str, Any], generation: Optional[int] = None,
+            size: Optional[int] = None):
+        """Store a value, evicting least recently used entries to stay under max_bytes"""
+        if not self.enabled:
+            return
+        # A write invalidated this key while the value was being loaded
+        if generation is not None and (
+            generation < self._floor or self._tombstones.get(key, -1) > generation
+        ):
+            return
+
+        if size is None:
+            size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, size, value)
+        self.size_bytes += size
+
+        while self.size_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, key: str):
+        """Drop a single entry after its portfolio changed"""
+        self._generation += 1
+        self._tombstones.pop(key, None)
+        self._tombstones[key] = self._generation
+        while len(self._tombstones) > PORTFOLIO_CACHE_MAX_TOMBSTONES:
+            _, generation = self._tombstones.popitem(last=False)
+            self._floor = max(self._floor, generation)
+        if self._remove(key):
+            self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry"""
+        self._generation += 1
+        self._floor = self._generation
+        self._tombstones.clear()
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for monitoring"""
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.size_bytes -= entry[1]
+        return True
+
+class TTLCache:
+    """Bounded LRU cache with a per-entry TTL, sized by entry count"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, value), least recently used first
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Any) -> Optional[Any]:
+        """Return a cached value, or None on a miss"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Any, value: Any, expires_at: Optional[float] = None):
+        """Store a value; expires_at (monotonic) can only shorten the TTL"""
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        deadline = time.monotonic() + self.ttl_seconds
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+
+        self._entries.pop(key, None)
+        self._entries[key] = (deadline, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Any):
+        """Drop a single entry"""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for monitoring"""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+# Published portfolio cache instance
+portfolio_cache = PortfolioCache()
@@ -0,0 +1,105 @@
+import os
+import struct
+import zlib
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+from .responses import encode_json
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+load_dotenv()
+
+# Precompression configuration
+PRECOMPRESS_GZIP_LEVEL = int(os.getenv("PRECOMPRESS_GZIP_LEVEL", 9))
+PRECOMPRESS_BROTLI_QUALITY = int(os.getenv("PRECOMPRESS_BROTLI_QUALITY", 11))
+
+# Preferred first when a client accepts several with the same q-value
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Fixed gzip member header: deflate, no flags, no mtime, unknown OS
+_GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+def choose_encoding(accept_encoding: Optional[str]) -> str:
+    """Pick the best precompressed encoding allowed by an Accept-Encoding header"""
+    if not accept_encoding:
+        return "identity"
+
+    qvalues = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qvalues[coding] = q
+
+    best, best_q = "identity", 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        q = qvalues.get(coding, qvalues.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+def _brotli_uncompressed_tail(data: bytes) -> bytes:
+    """
+    Uncompressed brotli meta-block holding data, followed by the final empty meta-block.
+
+    Header bits, least significant first: ISLAST=0, MNIBBLES=0 (four
+    nibbles), MLEN-1 in 16 bits, ISUNCOMPRESSED=1, then padding to a byte.
+    """
+    header = ((len(data) - 1) << 3) | (1 << 19)
+    return header.to_bytes(3, "little") + data + b"\x03"
+
+class PrecompressedJSON:
+    """
+    A JSON object encoded and compressed once, with one trailing field filled in per response.
+
+    Everything before the trailing field is compressed ahead of time and
+    ends on a byte boundary; each response appends only the few bytes of the
+    trailing value, so a counter such as views can change on every read
+    without compressing the whole payload again.
+    """
+
+    def __init__(self, content: Dict[str, Any], tail_key: str):
+        head = {key: value for key, value in content.items() if key != tail_key}
+        encoded = encode_json(head)
+        separator = b"," if head else b""
+        self.prefix = encoded[:-1] + separator + encode_json(tail_key) + b":"
+
+        # A sync flush ends on a byte boundary without closing the stream
+        compressor = zlib.compressobj(PRECOMPRESS_GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self.gzip_prefix = _GZIP_HEADER + compressor.compress(self.prefix) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.gzip_crc = zlib.crc32(self.prefix)
+
+        # Flushing likewise ends brotli's last meta-block on a byte boundary
+        self.brotli_prefix = None
+        if brotli is not None:
+            compressor = brotli.Compressor(quality=PRECOMPRESS_BROTLI_QUALITY)
+            self.brotli_prefix = compressor.process(self.prefix) + compressor.flush()
+
+    @property
+    def size(self) -> int:
+        """Bytes held by the identity and compressed prefixes"""
+        return len(self.prefix) + len(self.gzip_prefix) + len(self.brotli_prefix or b"")
+
+    def render(self, tail_value: Any, encoding: str = "identity") -> bytes:
+        """Body bytes with the trailing field set, in the given content encoding"""
+        tail = encode_json(tail_value) + b"}"
+        if encoding == "gzip":
+            compressor = zlib.compressobj(1, zlib.DEFLATED, -zlib.MAX_WBITS)
+            deflated = compressor.compress(tail) + compressor.flush()
+            trailer = struct.pack("<II", zlib.crc32(tail, self.gzip_crc), (len(self.prefix) + len(tail)) & 0xFFFFFFFF)
+            return self.gzip_prefix + deflated + trailer
+        if encoding == "br":
+            return self.brotli_prefix + _brotli_uncompressed_tail(tail)
+        return self.prefix + tail
@@ -0,0 +1,91 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional
+from fastapi import Request, status
+from fastapi.responses import Response
+
+from .responses import encode_json
+
+def content_hash(portfolio: dict) -> bytes:
+    """Digest of the editable content of a portfolio document"""
+    return hashlib.sha256(encode_json([
+        portfolio.get("template"), portfolio.get("data"), portfolio.get("is_published")
+    ])).digest()
+
+def _updated_at(portfolio: dict) -> Optional[datetime]:
+    return portfolio.get("updated_at") or portfolio.get("created_at")
+
+def portfolio_etag(portfolio: dict) -> str:
+    """Strong ETag from updated_at, the content hash and the view count of an owner's portfolio"""
+    digest = hashlib.sha256(content_hash(portfolio))
+    digest.update(str(_updated_at(portfolio)).encode())
+    digest.update(str(portfolio.get("views")).encode())
+    return '"' + digest.hexdigest()[:32] + '"'
+
+def public_etag(portfolio: dict) -> str:
+    """
+    Weak ETag for the public payload of a portfolio.
+
+    It leaves out the view count, which goes up on every read; a client
+    revalidating its copy gets a 304 as long as the content is unchanged
+    and keeps the count it already has.
+    """
+    digest = hashlib.sha256(content_hash(portfolio))
+    digest.update(str(_updated_at(portfolio)).encode())
+    return 'W/"' + digest.hexdigest()[:32] + '"'
+
+def page_etag(portfolios: Iterable[dict], *parts) -> str:
+    """Strong ETag for a page of portfolios plus anything else that shapes the response"""
+    digest = hashlib.sha256(encode_json(list(parts)))
+    for portfolio in portfolios:
+        digest.update(str(portfolio["_id"]).encode())
+        digest.update(portfolio_etag(portfolio).encode())
+    return '"' + digest.hexdigest()[:32] + '"'
+
+def last_modified(portfolio: dict) -> Optional[str]:
+    """HTTP date of the last edit; view counts do not move it"""
+    updated_at = _updated_at(portfolio)
+    if updated_at is None:
+        return None
+    return format_datetime(updated_at.replace(tzinfo=timezone.utc), usegmt=True)
+
+def validators(etag: str, modified: Optional[str] = None) -> dict:
+    headers = {"ETag": etag}
+    if modified:
+        headers["Last-Modified"] = modified
+    return headers
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison, as RFC 9110 requires for If-None-Match"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+def is_not_modified(request: Request, etag: str, modified: Optional[str] = None) -> bool:
+    """
+    Evaluate If-None-Match, or If-Modified-Since when no If-None-Match was sent.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or modified is None:
+        return False
+    try:
+        return parsedate_to_datetime(modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        # Unparseable dates are ignored
+        return False
+
+def not_modified(headers: dict) -> Response:
+    """Empty 304 carrying the validators"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
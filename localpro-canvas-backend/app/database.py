@@ -1,28 +1,99 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
 import os
 from dotenv import load_dotenv
+from .metrics import mongo_command_listener, mongo_pool_listener
 
 load_dotenv()
 
+def _optional_int(name: str):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+# Connection pool, wire compression and timeouts; unset values keep the driver defaults
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_IDLE_TIME_MS = _optional_int("MONGO_MAX_IDLE_TIME_MS")
+MONGO_WAIT_QUEUE_TIMEOUT_MS = _optional_int("MONGO_WAIT_QUEUE_TIMEOUT_MS")
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 10000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000))
+MONGO_SOCKET_TIMEOUT_MS = _optional_int("MONGO_SOCKET_TIMEOUT_MS")
+# Comma-separated, in order of preference, e.g. "zstd,snappy,zlib"; zstd and snappy
+# need the pymongo[zstd] / pymongo[snappy] extras and are skipped with a warning without them
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "")
+MONGO_ZLIB_COMPRESSION_LEVEL = _optional_int("MONGO_ZLIB_COMPRESSION_LEVEL")
+
+# Read preference for public, anonymous reads (/p/, batch lookups, snapshots, search)
+PUBLIC_READ_PREFERENCE = os.getenv("PUBLIC_READ_PREFERENCE", "secondaryPreferred")
+PUBLIC_READ_MAX_STALENESS_SECONDS = int(os.getenv("PUBLIC_READ_MAX_STALENESS_SECONDS", -1))
+
+# Create indexes when a process connects; the production launcher creates
+# them once before starting workers and turns this off for the workers
+MONGO_CREATE_INDEXES = os.getenv("MONGO_CREATE_INDEXES", "true").lower() == "true"
+
+# Keep the denormalized users.portfolios array in sync; when disabled it is
+# derived from the indexed portfolios.user_id field instead
+DENORMALIZE_USER_PORTFOLIOS = os.getenv("DENORMALIZE_USER_PORTFOLIOS", "true").lower() == "true"
+
+def client_options() -> dict:
+    """Keyword arguments for the Motor client built from the MONGO_* settings"""
+    mongo_pool_listener.max_pool_size = MONGO_MAX_POOL_SIZE
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "event_listeners": [mongo_command_listener, mongo_pool_listener],
+    }
+    optional = {
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "zlibCompressionLevel": MONGO_ZLIB_COMPRESSION_LEVEL,
+    }
+    options.update({key: value for key, value in optional.items() if value is not None})
+    if MONGO_COMPRESSORS:
+        options["compressors"] = MONGO_COMPRESSORS
+    return options
+
 class Database:
     client: AsyncIOMotorClient = None
     db = None
+    # Same database, reading with PUBLIC_READ_PREFERENCE; writes always go through db
+    public_db = None
+    create_indexes_on_connect = MONGO_CREATE_INDEXES
+    # Process that created client; a forked child must not reuse its parent's sockets
+    client_pid = None
     
     @classmethod
     async def connect_to_mongo(cls):
         """Connect to MongoDB"""
+        # Already connected, e.g. to a stand-in client installed by the benchmarks
+        if cls.client is not None and cls.client_pid in (None, os.getpid()):
+            return
+        
         try:
-            cls.client = AsyncIOMotorClient(os.getenv("MONGODB_URL"))
+            cls.client = AsyncIOMotorClient(os.getenv("MONGODB_URL"), **client_options())
+            cls.client_pid = os.getpid()
             cls.db = cls.client[os.getenv("DATABASE_NAME")]
+            cls.public_db = cls.client.get_database(
+                os.getenv("DATABASE_NAME"),
+                read_preference=make_read_preference(
+                    read_pref_mode_from_name(PUBLIC_READ_PREFERENCE),
+                    None,
+                    PUBLIC_READ_MAX_STALENESS_SECONDS
+                )
+            )
             
             # Test connection
             await cls.client.admin.command('ping')
             print("Successfully connected to MongoDB")
             
             # Create indexes
-            await cls.create_indexes()
+            if cls.create_indexes_on_connect:
+                await cls.create_indexes()
             
         except ConnectionFailure as e:
             print(f"Failed to connect to MongoDB: {e}")
@@ -33,6 +104,9 @@ class Database:
         """Close MongoDB connection"""
         if cls.client:
             cls.client.close()
+            cls.client = None
+            cls.client_pid = None
+            cls.public_db = None
             print("MongoDB connection closed")
     
     @classmethod
@@ -47,8 +121,40 @@ class Database:
         # Index for portfolio unique identifier
         await cls.db.portfolios.create_index("unique_identifier", unique=True)
         
-        # Index for user_id in portfolios
-        await cls.db.portfolios.create_index("user_id")
+        # Index for user_id in portfolios; the _id suffix serves keyset pagination
+        await cls.db.portfolios.create_index([("user_id", 1), ("_id", 1)])
+        
+        # Published portfolios, for the read model backfill
+        await cls.db.portfolios.create_index(
+            [("is_published", 1), ("_id", -1)]
+        )
+        
+        # Public search runs on the read model, which holds only published portfolios:
+        # newest-first browsing, skill filters and text
+        await cls.db.public_portfolios.create_index([("portfolio_id", -1)])
+        await cls.db.public_portfolios.create_index([("skills_normalized", 1), ("portfolio_id", -1)])
+        await cls.db.public_portfolios.create_index(
+            [("data.name", "text"), ("data.about", "text"), ("data.hobbies", "text")],
+            weights={"data.name": 10, "data.hobbies": 2, "data.about": 1},
+            name="public_text_search"
+        )
+        
+        # View analytics buckets: one document per portfolio, granularity and period
+        await cls.db.portfolio_view_buckets.create_index(
+            [("unique_identifier", 1), ("granularity", 1), ("start", 1)], unique=True
+        )
+        # Rollups and retention scan by period across all portfolios
+        await cls.db.portfolio_view_buckets.create_index([("granularity", 1), ("start", 1)])
+        
+        # Revision history: one document per portfolio and revision number
+        await cls.db.portfolio_revisions.create_index(
+            [("unique_identifier", 1), ("number", 1)], unique=True
+        )
+        # Cache invalidations shared between workers; polled by time and expired after an hour
+        await cls.db.public_changes.create_index("at", expireAfterSeconds=3600)
+        
+        # Revision compaction finds portfolios with long histories by their revision count
+        await cls.db.portfolios.create_index("revision", sparse=True)
         
         print("Database indexes created")
 
@@ -0,0 +1,44 @@
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable
+from bson import ObjectId
+
+# Export batch size limits
+DEFAULT_EXPORT_BATCH_SIZE = 500
+MAX_EXPORT_BATCH_SIZE = 5000
+
+def _json_default(value: Any):
+    """Encode Mongo and datetime values for NDJSON output"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+async def stream_ndjson(cursor, transform: Callable[[dict], dict], batch_size: int,
+                        compress: bool = False) -> AsyncIterator[bytes]:
+    """
+    Yield a Motor cursor as NDJSON, one chunk per cursor batch.
+
+    The response pulls chunks as the client reads them, so at most one
+    batch is held in memory at a time.
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+    lines = []
+
+    async for doc in cursor.batch_size(batch_size):
+        lines.append(json.dumps(transform(doc), default=_json_default, separators=(",", ":")))
+        if len(lines) >= batch_size:
+            chunk = ("\n".join(lines) + "\n").encode()
+            lines = []
+            if compressor:
+                # Sync flush so the client receives every batch as it is produced
+                chunk = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            yield chunk
+
+    chunk = ("\n".join(lines) + "\n").encode() if lines else b""
+    if compressor:
+        yield compressor.compress(chunk) + compressor.flush()
+    elif chunk:
+        yield chunk
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import re
+import unicodedata
+from pymongo import ReturnDocument
+from dotenv import load_dotenv
+from .database import db
+
+load_dotenv()
+
+# Identifier allocation configuration
+IDENTIFIER_BLOCK_SIZE = int(os.getenv("IDENTIFIER_BLOCK_SIZE", 1000))
+IDENTIFIER_SLUG_MAX_LENGTH = 40
+IDENTIFIER_COUNTER_ID = "portfolio_identifier"
+
+BASE62_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+def encode_base62(number: int) -> str:
+    """Base62 digits of a non-negative integer"""
+    if number == 0:
+        return BASE62_ALPHABET[0]
+    digits = []
+    while number:
+        number, remainder = divmod(number, 62)
+        digits.append(BASE62_ALPHABET[remainder])
+    return "".join(reversed(digits))
+
+def slugify(name: str) -> str:
+    """URL-safe slug of a portfolio name: ASCII letters, digits and single hyphens"""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    slug = re.sub(r"[^a-z0-9]+", "-", ascii_name.lower()).strip("-")
+    slug = slug[:IDENTIFIER_SLUG_MAX_LENGTH].rstrip("-")
+    return slug or "portfolio"
+
+def format_identifier(name: str, number: int) -> str:
+    """
+    Identifier for a portfolio: name slug plus the base62 counter value.
+
+    Base62 digits never contain a hyphen, so the part after the last hyphen
+    is the counter and two different counter values can never produce the
+    same identifier, whatever the names. Counters stay under eight digits
+    until 62**7, so they cannot match the 8-hex-digit suffixes of
+    identifiers created before the allocator.
+    """
+    return f"{slugify(name)}-{encode_base62(number)}"
+
+class IdentifierAllocator:
+    """
+    Hand out portfolio identifiers from counter blocks leased from MongoDB.
+
+    One atomic $inc on the counters collection reserves block_size values
+    for this process, so identifiers are unique across every worker without
+    a retry loop, and only one create in block_size pays a round trip.
+    Values left in a block when the process exits are skipped, not reused.
+    """
+
+    def __init__(self, block_size: int = IDENTIFIER_BLOCK_SIZE, counter_id: str = IDENTIFIER_COUNTER_ID):
+        self.block_size = block_size
+        self.counter_id = counter_id
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+
+    async def _lease(self):
+        counter = await db.db.counters.find_one_and_update(
+            {"_id": self.counter_id},
+            {"$inc": {"next": self.block_size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._end = counter["next"]
+        self._next = self._end - self.block_size
+
+    async def next_number(self) -> int:
+        """Next counter value, leasing a new block when the current one is used up"""
+        while self._next >= self._end:
+            async with self._lock:
+                # Another task may have leased while this one waited
+                if self._next >= self._end:
+                    await self._lease()
+        number = self._next
+        self._next += 1
+        return number
+
+    async def allocate(self, name: str) -> str:
+        """New unique identifier for a portfolio with this name"""
+        return format_identifier(name, await self.next_number())
+
+# Identifier allocator instance
+identifier_allocator = IdentifierAllocator()
@@ -1,23 +1,72 @@
-from fastapi import FastAPI, Depends, HTTPException, status, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, status, BackgroundTasks, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from contextlib import asynccontextmanager
+import copy
+import os
 import uuid
-from typing import List
+import json
+from typing import Dict, Optional, Tuple
 import asyncio
+import traceback
 from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 
-from .database import db
-from .models import User, Portfolio, PortfolioData, ContactDetails, Token, UserRole
+from .database import db, DENORMALIZE_USER_PORTFOLIOS
+from .models import (
+    Principal, PRINCIPAL_PROJECTION, Portfolio, PortfolioData,
+    ContactDetails, Token, UserRole
+)
 from .schemas import (
     UserCreate, UserLogin, UserResponse, 
     PortfolioCreate, PortfolioResponse, PortfolioPublicResponse,
-    PortfolioUpdate, SuccessResponse
+    PortfolioUpdate, SuccessResponse, PortfolioPage, UserPage,
+    PortfolioBatchRequest, PortfolioBatchResponse, PortfolioSearchPage,
+    PortfolioStatsResponse, PortfolioRevisionPage, PortfolioRevisionContent,
+    PortfolioRevisionDiff
 )
 from .auth import (
     authenticate_user, create_access_token, 
-    get_current_active_user, get_password_hash,
-    generate_unique_identifier
+    get_current_active_user, get_password_hash_async,
+    password_executor,
+    principal_cache, token_cache
+)
+from .view_counter import view_counter
+from .identifiers import identifier_allocator
+from .patch import (
+    JSON_PATCH_CONTENT_TYPE, MERGE_PATCH_CONTENT_TYPE, json_patch_update, merge_patch_update
+)
+from .analytics import (
+    ANALYTICS_DAILY_RETENTION_DAYS, ANALYTICS_HOURLY_RETENTION_DAYS, DAY,
+    read_buckets
+)
+from .revisions import (
+    apply_changes, diff_content, list_revisions, read_revision, record_revision,
+    revision_content, snapshot_revision, update_changes
+)
+from .cache import portfolio_cache
+from .maintenance import RUN_MAINTENANCE_TASKS, start_maintenance, stop_maintenance
+from .metrics import MetricsMiddleware, registry
+from .responses import FAST_RESPONSES, FastJSONResponse
+from .compression import PrecompressedJSON, choose_encoding
+from .conditional import (
+    is_not_modified, last_modified, not_modified, page_etag, portfolio_etag,
+    public_etag, validators
+)
+from .snapshots import (
+    SNAPSHOT_CACHE_CONTROL, TEMPLATES, read_snapshot, refresh_snapshots,
+    remove_snapshots, render_snapshot, snapshot_etag
+)
+from .search import normalize_skills, skill_facets
+from .public_portfolios import (
+    PUBLIC_FIELDS, public_change_feed, public_reader,
+    remove_public_portfolio, sync_public_portfolio
+)
+from .export import DEFAULT_EXPORT_BATCH_SIZE, MAX_EXPORT_BATCH_SIZE, stream_ndjson
+from .pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, decode_cursor, encode_offset_cursor,
+    decode_offset_cursor, parse_fields
 )
 
 @asynccontextmanager
@@ -31,9 +80,22 @@ async def lifespan(app: FastAPI):
         app.state.db_connected = True
     except Exception as exc:
         print(f"MongoDB unavailable at startup: {exc}")
+    password_executor.start()
+    await view_counter.start()
+    if RUN_MAINTENANCE_TASKS:
+        await start_maintenance()
+    # Reads the stored facets when another process computes them
+    await skill_facets.start()
+    await public_change_feed.start()
     yield
     # Shutdown
     print("Shutting down...")
+    await stop_maintenance()
+    await skill_facets.stop()
+    await public_change_feed.stop()
+    # Flush buffered view counts before the connection goes away
+    await view_counter.stop()
+    password_executor.shutdown()
     await db.close_mongo_connection()
 
 # Create FastAPI app
@@ -56,6 +118,79 @@ def _normalize_portfolio_doc(portfolio: dict) -> dict:
         "updated_at": updated_at,
     }
 
+def _portfolio_response_dict(portfolio: dict) -> dict:
+    """Build exactly the PortfolioResponse fields from a Mongo document."""
+    normalized = _normalize_portfolio_doc(portfolio)
+    return {
+        "id": normalized["id"],
+        "unique_identifier": normalized["unique_identifier"],
+        "user_id": normalized["user_id"],
+        "template": normalized["template"],
+        "data": normalized["data"],
+        "is_published": normalized["is_published"],
+        "views": normalized["views"],
+        "created_at": normalized["created_at"],
+        "updated_at": normalized["updated_at"],
+    }
+
+def _respond(model, payload: dict):
+    """
+    Return a payload as its response model, or in fast mode as pre-built JSON.
+
+    The fast path skips building the model and FastAPI's second validation
+    pass against response_model; payloads come from documents validated on write.
+    """
+    if FAST_RESPONSES:
+        return FastJSONResponse(payload)
+    return model(**payload)
+
+def _public_response_dict(document: dict, unflushed_views: int) -> dict:
+    """Take the response fields of a public_portfolios document, counting unflushed views."""
+    response = {field: document[field] for field in PUBLIC_FIELDS}
+    response["views"] += unflushed_views
+    return response
+
+def _new_portfolio_doc(unique_id: str, user_id, template: str, data: PortfolioData) -> dict:
+    """Build the document stored for a newly created portfolio."""
+    now = datetime.utcnow()
+    return {
+        "unique_identifier": unique_id,
+        "user_id": user_id,
+        "template": template,
+        "data": data.dict(),
+        "skills_normalized": normalize_skills(data.skills),
+        "is_published": False,
+        "views": 0,
+        "revision": 1,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+async def _get_user_portfolio_ids(user_ids: list) -> dict:
+    """Map user ids to their portfolio identifiers using the portfolios.user_id index."""
+    portfolio_ids = {user_id: [] for user_id in user_ids}
+    cursor = db.db.portfolios.find(
+        {"user_id": {"$in": user_ids}},
+        {"user_id": 1, "unique_identifier": 1}
+    ).sort("_id", 1)
+    async for portfolio in cursor:
+        portfolio_ids.setdefault(portfolio["user_id"], []).append(portfolio["unique_identifier"])
+    return portfolio_ids
+
+def _user_response(user: Principal, portfolios: list) -> UserResponse:
+    """Build a UserResponse from a principal and its portfolio identifiers."""
+    return UserResponse(
+        id=str(user.id),
+        email=user.email,
+        username=user.username,
+        full_name=user.full_name,
+        is_active=user.is_active,
+        is_verified=user.is_verified,
+        role=user.role,
+        portfolios=portfolios,
+        created_at=user.created_at
+    )
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -65,6 +200,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Metrics middleware; added last so it also times CORS handling
+app.add_middleware(MetricsMiddleware)
+
 # Health check endpoint
 @app.get("/", tags=["Health"])
 async def root():
@@ -74,6 +212,21 @@ async def root():
         "version": "1.0.0"
     }
 
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+async def metrics():
+    """
+    Prometheus metrics for HTTP routes and MongoDB commands
+    
+    Counters are kept per process. Under the multi-worker launcher a scrape
+    is answered by whichever worker accepts it, so it shows that worker's
+    counters only; run one worker per container (WEB_CONCURRENCY=1) and
+    scale containers when complete per-process metrics are needed.
+    """
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
 @app.get("/health", tags=["Health"])
 async def health_check():
     try:
@@ -102,30 +255,27 @@ async def register_user(user_data: UserCreate):
     Register a new user
     """
     try:
-        # Check if user already exists
-        existing_user = await db.db.users.find_one({"email": user_data.email})
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
-        
-        # Check username if provided
-        if user_data.username:
-            existing_username = await db.db.users.find_one({"username": user_data.username})
-            if existing_username:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Username already taken"
-                )
-        
         # Create user document
         user_dict = user_data.dict()
-        user_dict["hashed_password"] = get_password_hash(user_data.password)
+        user_dict["hashed_password"] = await get_password_hash_async(user_data.password)
         user_dict.pop("password")  # Remove plain password
+        if not user_dict.get("username"):
+            # The sparse username index only skips documents without the field
+            user_dict.pop("username", None)
         
-        # Insert user
-        result = await db.db.users.insert_one(user_dict)
+        # Insert user; the unique email and username indexes reject duplicates
+        try:
+            result = await db.db.users.insert_one(user_dict)
+        except DuplicateKeyError as e:
+            key_pattern = (e.details or {}).get("keyPattern") or {}
+            if "username" in key_pattern or ("email" not in key_pattern and "username" in str(e)):
+                detail = "Username already taken"
+            else:
+                detail = "Email already registered"
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=detail
+            )
         
         # Return success response
         return SuccessResponse(
@@ -175,27 +325,24 @@ async def login_user(user_data: UserLogin):
         )
 
 @app.get("/users/me", response_model=UserResponse, tags=["Users"])
-async def get_current_user_info(current_user: User = Depends(get_current_active_user)):
+async def get_current_user_info(current_user: Principal = Depends(get_current_active_user)):
     """
     Get current user information
     """
-    return UserResponse(
-        id=str(current_user.id),
-        email=current_user.email,
-        username=current_user.username,
-        full_name=current_user.full_name,
-        is_active=current_user.is_active,
-        is_verified=current_user.is_verified,
-        role=current_user.role,
-        portfolios=current_user.portfolios,
-        created_at=current_user.created_at
-    )
+    # The principal is slim, so load the portfolio list only here
+    if DENORMALIZE_USER_PORTFOLIOS:
+        user = await db.db.users.find_one({"_id": current_user.id}, {"portfolios": 1})
+        portfolios = (user or {}).get("portfolios", [])
+    else:
+        portfolios = (await _get_user_portfolio_ids([current_user.id]))[current_user.id]
+    
+    return _user_response(current_user, portfolios)
 
 # Portfolio endpoints
 @app.post("/portfolios", response_model=SuccessResponse, tags=["Portfolios"])
 async def create_portfolio(
     portfolio_data: PortfolioCreate,
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Create a new portfolio
@@ -211,31 +358,23 @@ async def create_portfolio(
             )
         
         # Generate unique identifier
-        unique_id = generate_unique_identifier(
-            portfolio_data_validated.name,
-            str(current_user.id)
-        )
+        unique_id = await identifier_allocator.allocate(portfolio_data_validated.name)
         
         # Create portfolio document
-        portfolio_dict = {
-            "unique_identifier": unique_id,
-            "user_id": current_user.id,
-            "template": portfolio_data.template,
-            "data": portfolio_data_validated.dict(),
-            "is_published": False,
-            "views": 0,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow(),
-        }
+        portfolio_dict = _new_portfolio_doc(
+            unique_id, current_user.id, portfolio_data.template, portfolio_data_validated
+        )
         
         # Insert portfolio
         result = await db.db.portfolios.insert_one(portfolio_dict)
+        await record_revision(portfolio_dict, "create")
         
         # Update user's portfolio list
-        await db.db.users.update_one(
-            {"_id": current_user.id},
-            {"$push": {"portfolios": unique_id}}
-        )
+        if DENORMALIZE_USER_PORTFOLIOS:
+            await db.db.users.update_one(
+                {"_id": current_user.id},
+                {"$push": {"portfolios": unique_id}}
+            )
         
         # Return success response with unique identifier
         return SuccessResponse(
@@ -255,17 +394,209 @@ async def create_portfolio(
             detail=f"Failed to create portfolio: {str(e)}"
         )
 
-@app.get("/portfolios", response_model=List[PortfolioResponse], tags=["Portfolios"])
-async def get_user_portfolios(current_user: User = Depends(get_current_active_user)):
+# Bulk import limits
+BULK_IMPORT_CHUNK_SIZE = 500
+BULK_IMPORT_MAX_ITEMS = 10000
+PUBLIC_BATCH_MAX_IDENTIFIERS = int(os.getenv("PUBLIC_BATCH_MAX_IDENTIFIERS", 100))
+
+async def _iter_bulk_items(request: Request):
+    """Yield raw items from an NDJSON stream or a JSON array body."""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type:
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if buffer.strip():
+            yield buffer
+        return
+    
+    try:
+        items = json.loads(await request.body())
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid JSON body: {str(e)}"
+        )
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expected a JSON array of portfolios"
+        )
+    # An array is complete up front, so an oversized one is refused before any write
+    if len(items) > BULK_IMPORT_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BULK_IMPORT_MAX_ITEMS} portfolios per request"
+        )
+    for item in items:
+        yield item
+
+async def _import_portfolio_chunk(chunk: list, user_id, results: list):
+    """Insert one chunk of (index, document) pairs and record per-item results."""
+    docs = [doc for _, doc in chunk]
+    failed = {}
+    try:
+        await db.db.portfolios.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            failed[error["index"]] = error.get("errmsg", "Write failed")
+    
+    created = []
+    revisions = []
+    for position, (index, doc) in enumerate(chunk):
+        if position in failed:
+            results.append({"index": index, "success": False, "error": failed[position]})
+            continue
+        created.append(doc["unique_identifier"])
+        revisions.append(snapshot_revision(doc))
+        results.append({
+            "index": index,
+            "success": True,
+            "portfolio_id": str(doc["_id"]),
+            "unique_identifier": doc["unique_identifier"],
+            "url": f"/{doc['template']}/{doc['unique_identifier']}"
+        })
+    
+    if revisions:
+        try:
+            await db.db.portfolio_revisions.insert_many(revisions, ordered=False)
+        except BulkWriteError as e:
+            print(f"Failed to record {len(e.details.get('writeErrors', []))} imported portfolio revisions")
+    
+    # One owner update per chunk instead of one per portfolio
+    if created and DENORMALIZE_USER_PORTFOLIOS:
+        await db.db.users.update_one(
+            {"_id": user_id},
+            {"$push": {"portfolios": {"$each": created}}}
+        )
+
+@app.post("/portfolios/bulk", response_model=SuccessResponse, tags=["Portfolios"])
+async def bulk_create_portfolios(
+    request: Request,
+    current_user: Principal = Depends(get_current_active_user)
+):
     """
-    Get all portfolios for current user
+    Create many portfolios from an NDJSON stream or a JSON array
+    
+    A JSON array over the item limit is rejected whole. An NDJSON stream is
+    imported up to the limit; the first item past it is reported as failed,
+    the rest of the stream is not read, and data.truncated is set.
     """
+    results = []
+    chunk = []
+    index = -1
+    truncated = False
     try:
-        portfolios = []
-        async for portfolio in db.db.portfolios.find({"user_id": current_user.id}):
-            portfolios.append(PortfolioResponse(**_normalize_portfolio_doc(portfolio)))
+        async for item in _iter_bulk_items(request):
+            index += 1
+            if index >= BULK_IMPORT_MAX_ITEMS:
+                # Earlier chunks are already stored, so report them instead of failing the request
+                results.append({
+                    "index": index,
+                    "success": False,
+                    "error": f"At most {BULK_IMPORT_MAX_ITEMS} portfolios per request; "
+                             "this and any later items were not imported"
+                })
+                truncated = True
+                break
+            
+            # Validate each item; invalid ones are reported and skipped
+            try:
+                if isinstance(item, (bytes, str)):
+                    item = json.loads(item)
+                portfolio_data = PortfolioCreate(**item)
+                portfolio_data_validated = PortfolioData(**portfolio_data.data)
+            except Exception as e:
+                results.append({"index": index, "success": False, "error": f"Invalid portfolio data: {str(e)}"})
+                continue
+            
+            unique_id = await identifier_allocator.allocate(portfolio_data_validated.name)
+            chunk.append((index, _new_portfolio_doc(
+                unique_id, current_user.id, portfolio_data.template, portfolio_data_validated
+            )))
+            
+            if len(chunk) >= BULK_IMPORT_CHUNK_SIZE:
+                await _import_portfolio_chunk(chunk, current_user.id, results)
+                chunk = []
+        
+        if chunk:
+            await _import_portfolio_chunk(chunk, current_user.id, results)
         
-        return portfolios
+        results.sort(key=lambda result: result["index"])
+        created = sum(1 for result in results if result["success"])
+        return SuccessResponse(
+            message=f"Created {created} of {len(results)} portfolios",
+            data={
+                "created": created,
+                "failed": len(results) - created,
+                "truncated": truncated,
+                "results": results
+            }
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to import portfolios: {str(e)}"
+        )
+
+@app.get("/portfolios", response_model=PortfolioPage, tags=["Portfolios"])
+async def get_user_portfolios(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated response fields"),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """
+    Get portfolios for current user, one page at a time
+    """
+    selected = parse_fields(fields, PortfolioResponse.__fields__)
+    after_id = decode_cursor(cursor)
+    
+    try:
+        query = {"user_id": current_user.id}
+        if after_id is not None:
+            query["_id"] = {"$gt": after_id}
+        
+        projection = None
+        if selected:
+            # Keys needed by _normalize_portfolio_doc are always loaded
+            projection = {field: 1 for field in selected if field != "id"}
+            projection.update({"user_id": 1, "created_at": 1, "updated_at": 1})
+        
+        # Served by the {user_id, _id} index; one extra document tells us if there is a next page
+        results = db.db.portfolios.find(query, projection).sort("_id", 1).limit(limit + 1)
+        docs = await results.to_list(length=limit + 1)
+        next_cursor = encode_cursor(docs[limit - 1]["_id"]) if len(docs) > limit else None
+        
+        # Answer polling clients before any item is built or encoded
+        headers = validators(page_etag(docs[:limit], selected, next_cursor))
+        if is_not_modified(request, headers["ETag"]):
+            return not_modified(headers)
+        
+        items = []
+        for portfolio in docs[:limit]:
+            if selected:
+                normalized = _normalize_portfolio_doc(portfolio)
+                items.append({field: normalized[field] for field in selected})
+            elif FAST_RESPONSES:
+                items.append(_portfolio_response_dict(portfolio))
+            else:
+                items.append(PortfolioResponse(**_portfolio_response_dict(portfolio)))
+        
+        if FAST_RESPONSES:
+            # The whole page is encoded in a single pass
+            return FastJSONResponse({"items": items, "next_cursor": next_cursor}, headers=headers)
+        response.headers.update(headers)
+        return PortfolioPage(items=items, next_cursor=next_cursor)
         
     except Exception as e:
         raise HTTPException(
@@ -276,7 +607,9 @@ async def get_user_portfolios(current_user: User = Depends(get_current_active_us
 @app.get("/portfolios/{unique_identifier}", response_model=PortfolioResponse, tags=["Portfolios"])
 async def get_portfolio_by_identifier(
     unique_identifier: str,
-    current_user: User = Depends(get_current_active_user)
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Get portfolio by unique identifier (for owner)
@@ -293,7 +626,14 @@ async def get_portfolio_by_identifier(
                 detail="Portfolio not found or access denied"
             )
         
-        return PortfolioResponse(**_normalize_portfolio_doc(portfolio))
+        headers = validators(portfolio_etag(portfolio), last_modified(portfolio))
+        if is_not_modified(request, headers["ETag"], headers.get("Last-Modified")):
+            return not_modified(headers)
+        
+        if FAST_RESPONSES:
+            return FastJSONResponse(_portfolio_response_dict(portfolio), headers=headers)
+        response.headers.update(headers)
+        return PortfolioResponse(**_portfolio_response_dict(portfolio))
         
     except HTTPException:
         raise
@@ -303,16 +643,85 @@ async def get_portfolio_by_identifier(
             detail=f"Failed to fetch portfolio: {str(e)}"
         )
 
+@app.get("/portfolios/{unique_identifier}/stats", response_model=PortfolioStatsResponse, tags=["Portfolios"])
+async def get_portfolio_stats(
+    unique_identifier: str,
+    granularity: str = Query(DAY, pattern="^(day|hour)$"),
+    periods: int = Query(30, ge=1, description="Number of days or hours, ending with the current one"),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """
+    Get view counts over time for a portfolio (for owner)
+    
+    Daily buckets are rolled up from hourly ones in the background, so the
+    current day trails the hourly counts by up to one rollup interval.
+    """
+    retention_days = ANALYTICS_DAILY_RETENTION_DAYS if granularity == DAY else ANALYTICS_HOURLY_RETENTION_DAYS
+    max_periods = retention_days if granularity == DAY else retention_days * 24
+    if periods > max_periods:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {max_periods} {granularity} buckets are retained"
+        )
+    
+    try:
+        portfolio = await db.db.portfolios.find_one(
+            {"unique_identifier": unique_identifier, "user_id": current_user.id},
+            {"_id": 1}
+        )
+        if not portfolio:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Portfolio not found or access denied"
+            )
+        
+        buckets = await read_buckets(unique_identifier, granularity, periods)
+        return PortfolioStatsResponse(
+            unique_identifier=unique_identifier,
+            granularity=granularity,
+            total=sum(bucket["views"] for bucket in buckets),
+            buckets=buckets
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch portfolio stats: {str(e)}"
+        )
+
+def _public_portfolio_response(cached: dict, request: Request) -> Response:
+    """Send a cached public payload in the requested encoding, with this read's view count"""
+    headers = {"Vary": "Accept-Encoding", **cached["validators"]}
+    if is_not_modified(request, headers["ETag"], headers.get("Last-Modified")):
+        return not_modified(headers)
+    
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(
+        content=cached["body"].render(cached["views"], encoding),
+        media_type="application/json",
+        headers=headers
+    )
+
 @app.get("/p/{unique_identifier}", response_model=PortfolioPublicResponse, tags=["Portfolios"])
-async def get_public_portfolio(unique_identifier: str):
+async def get_public_portfolio(unique_identifier: str, request: Request):
     """
     Get public portfolio by unique identifier (no auth required)
     """
     try:
-        portfolio = await db.db.portfolios.find_one({
-            "unique_identifier": unique_identifier,
-            "is_published": True
-        })
+        # A 304 is still a visit and is counted; see public_etag
+        cached = portfolio_cache.get(unique_identifier)
+        if cached is not None:
+            view_counter.increment(unique_identifier)
+            cached["views"] += 1  # this view
+            return _public_portfolio_response(cached, request)
+        
+        generation = portfolio_cache.generation()
+        # Point read on the public read model; only published portfolios are in it
+        portfolio = await public_reader(unique_identifier).public_portfolios.find_one({"_id": unique_identifier})
         
         if not portfolio:
             raise HTTPException(
@@ -320,53 +729,223 @@ async def get_public_portfolio(unique_identifier: str):
                 detail="Portfolio not found or not published"
             )
         
-        # Increment view count
-        await db.db.portfolios.update_one(
-            {"_id": portfolio["_id"]},
-            {"$inc": {"views": 1}}
+        # Buffer the view; it is written in the next batched flush
+        unflushed_views = view_counter.increment(unique_identifier)
+        
+        response = _public_response_dict(portfolio, unflushed_views)  # includes this view
+        
+        # Encode and compress everything but the view count once per cache fill
+        body = await asyncio.to_thread(PrecompressedJSON, response, "views")
+        cached = {
+            "views": response["views"],
+            "body": body,
+            "validators": validators(public_etag(portfolio), last_modified(portfolio))
+        }
+        
+        # Cached views keep counting up locally, so readers never see them drop
+        portfolio_cache.set(unique_identifier, cached, generation=generation, size=body.size)
+        
+        return _public_portfolio_response(cached, request)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch portfolio: {str(e)}"
         )
+
+@app.post("/p/batch", response_model=PortfolioBatchResponse, tags=["Portfolios"])
+async def get_public_portfolios_batch(batch: PortfolioBatchRequest):
+    """
+    Get many public portfolios in one request (no auth required)
+    
+    Every requested identifier is a key of the result; missing or
+    unpublished portfolios map to null.
+    """
+    identifiers = list(dict.fromkeys(batch.identifiers))
+    if len(identifiers) > PUBLIC_BATCH_MAX_IDENTIFIERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {PUBLIC_BATCH_MAX_IDENTIFIERS} identifiers per request"
+        )
+    
+    try:
+        # One $in query over the public read model's _id index
+        results = public_reader().public_portfolios.find({"_id": {"$in": identifiers}})
+        found = {}
+        async for portfolio in results:
+            unique_identifier = portfolio["unique_identifier"]
+            # Buffered like single reads, so the whole batch lands in one bulk_write
+            unflushed_views = view_counter.increment(unique_identifier)
+            found[unique_identifier] = _public_response_dict(portfolio, unflushed_views)
+            
+            # Keep a cached /p/ payload in step with the counted view
+            cached = portfolio_cache.get(unique_identifier)
+            if cached is not None:
+                cached["views"] += 1
+        
+        payload = {"portfolios": {
+            unique_identifier: found.get(unique_identifier) for unique_identifier in identifiers
+        }}
+        return _respond(PortfolioBatchResponse, payload)
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch portfolios: {str(e)}"
+        )
+
+@app.get("/search/portfolios", response_model=PortfolioSearchPage, tags=["Search"])
+async def search_portfolios(
+    q: Optional[str] = Query(None, description="Words to match in name, about and hobbies"),
+    skills: Optional[str] = Query(None, description="Comma-separated skills; all must match"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    """
+    Search published portfolios (no auth required)
+    
+    Newest first; with q, most relevant first, each page resuming at an offset.
+    """
+    text = q.strip() if q else ""
+    if text:
+        offset = decode_offset_cursor(cursor)
+    else:
+        before_id = decode_cursor(cursor)
+    
+    try:
+        # The public read model holds only published portfolios
+        query = {}
+        if text:
+            query["$text"] = {"$search": text}
+        if skills:
+            wanted = normalize_skills(skills.split(","))
+            if wanted:
+                query["skills_normalized"] = {"$all": wanted}
+        
+        # One extra document tells us if there is a next page
+        collection = public_reader().public_portfolios
+        if text:
+            # Ranked by the text index's score; a top-k sort, bounded by the page
+            score = {"$meta": "textScore"}
+            results = collection.find(query, {"score": score}).sort(
+                [("score", score), ("portfolio_id", -1)]
+            ).skip(offset).limit(limit + 1)
+        else:
+            if before_id is not None:
+                query["portfolio_id"] = {"$lt": before_id}
+            results = collection.find(query).sort("portfolio_id", -1).limit(limit + 1)
+        docs = await results.to_list(length=limit + 1)
         
-        normalized = _normalize_portfolio_doc(portfolio)
+        items = [
+            _public_response_dict(portfolio, view_counter.unflushed(portfolio["_id"]))
+            for portfolio in docs[:limit]
+        ]
+        next_cursor = None
+        if len(docs) > limit:
+            next_cursor = encode_offset_cursor(offset + limit) if text else encode_cursor(docs[limit - 1]["portfolio_id"])
+        payload = {
+            "items": items,
+            "next_cursor": next_cursor,
+            "facets": skill_facets.skills,
+            "facets_refreshed_at": skill_facets.refreshed_at
+        }
+        return _respond(PortfolioSearchPage, payload)
         
-        return PortfolioPublicResponse(
-            unique_identifier=normalized["unique_identifier"],
-            template=normalized["template"],
-            data=normalized["data"],
-            is_published=normalized["is_published"],
-            views=normalized["views"] + 1,  # +1 for this view
-            created_at=normalized["created_at"]
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to search portfolios: {str(e)}"
+        )
+
+@app.get("/snapshots/{template}/{unique_identifier}", response_class=Response, tags=["Portfolios"])
+async def get_portfolio_snapshot(
+    template: str,
+    unique_identifier: str,
+    request: Request,
+    background_tasks: BackgroundTasks
+):
+    """
+    Get the pre-rendered HTML page of a published portfolio (no auth required)
+    """
+    if template not in TEMPLATES:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown template"
         )
+    
+    try:
+        body = await read_snapshot(template, unique_identifier)
+        if body is None:
+            # Published before snapshots existed, or the render is still pending
+            portfolio = await public_reader(unique_identifier).public_portfolios.find_one({"_id": unique_identifier})
+            if not portfolio:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Portfolio not found or not published"
+                )
+            body = render_snapshot(template, portfolio).encode("utf-8")
+            background_tasks.add_task(refresh_snapshots, portfolio)
+        
+        view_counter.increment(unique_identifier)
+        
+        headers = {"Cache-Control": SNAPSHOT_CACHE_CONTROL, "ETag": snapshot_etag(body)}
+        if is_not_modified(request, headers["ETag"]):
+            return not_modified(headers)
+        return Response(body, media_type="text/html; charset=utf-8", headers=headers)
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to fetch portfolio: {str(e)}"
+            detail=f"Failed to fetch portfolio snapshot: {str(e)}"
         )
 
+async def _after_portfolio_update(portfolio: dict, background_tasks: BackgroundTasks):
+    """Bring the public read model, cache and snapshots up to date with an updated portfolio."""
+    # The write has committed; failing the request now would only invite a retry
+    try:
+        await sync_public_portfolio(portfolio)
+    except Exception as e:
+        print(f"Failed to sync public portfolio {portfolio['unique_identifier']}: {e}")
+    portfolio_cache.invalidate(portfolio["unique_identifier"])
+    # Re-render the static snapshots after the response is sent
+    background_tasks.add_task(refresh_snapshots, portfolio)
+
+async def _set_portfolio_fields(unique_identifier: str, user_id, update_dict: dict, action: str,
+                                restored_from: Optional[int] = None) -> Optional[dict]:
+    """
+    Overwrite whole portfolio fields and record the revision; returns the updated portfolio.
+
+    The document before the write comes back from the same atomic update
+    that numbers the revision, so the stored delta is exactly this write.
+    """
+    # The owner filter doubles as the access check
+    before = await db.db.portfolios.find_one_and_update(
+        {"unique_identifier": unique_identifier, "user_id": user_id},
+        {"$set": update_dict, "$inc": {"revision": 1}},
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        return None
+    portfolio = {**before, **update_dict, "revision": before.get("revision", 0) + 1}
+    changes = diff_content(revision_content(before), revision_content(portfolio))
+    await record_revision(portfolio, action, changes, restored_from)
+    return portfolio
+
 @app.put("/portfolios/{unique_identifier}", response_model=SuccessResponse, tags=["Portfolios"])
 async def update_portfolio(
     unique_identifier: str,
     update_data: PortfolioUpdate,
-    current_user: User = Depends(get_current_active_user)
+    background_tasks: BackgroundTasks,
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Update portfolio
     """
     try:
-        # Find portfolio
-        portfolio = await db.db.portfolios.find_one({
-            "unique_identifier": unique_identifier,
-            "user_id": current_user.id
-        })
-        
-        if not portfolio:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Portfolio not found or access denied"
-            )
-        
         # Prepare update data
         update_dict = {"updated_at": datetime.utcnow()}
         if update_data.data is not None:
@@ -374,6 +953,7 @@ async def update_portfolio(
             try:
                 portfolio_data_validated = PortfolioData(**update_data.data)
                 update_dict["data"] = portfolio_data_validated.dict()
+                update_dict["skills_normalized"] = normalize_skills(portfolio_data_validated.skills)
             except Exception as e:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -383,11 +963,14 @@ async def update_portfolio(
         if update_data.is_published is not None:
             update_dict["is_published"] = update_data.is_published
         
-        # Update portfolio
-        await db.db.portfolios.update_one(
-            {"_id": portfolio["_id"]},
-            {"$set": update_dict}
-        )
+        portfolio = await _set_portfolio_fields(unique_identifier, current_user.id, update_dict, "update")
+        
+        if portfolio is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Portfolio not found or access denied"
+            )
+        await _after_portfolio_update(portfolio, background_tasks)
         
         return SuccessResponse(
             message="Portfolio updated successfully"
@@ -401,32 +984,302 @@ async def update_portfolio(
             detail=f"Failed to update portfolio: {str(e)}"
         )
 
+async def _patched_skills_normalized(owner: dict, update: Dict[str, dict]) -> Tuple[dict, dict]:
+    """
+    skills_normalized after a patch, to $set in the same write; returns (fields, filter conditions).
+
+    Array operators on data.skills need the current skills, so they are read
+    first and the write only matches while they are unchanged.
+    """
+    changes = [
+        change for change in update_changes(update)
+        if change["path"] == "data" or change["path"].startswith("data.skills")
+    ]
+    if not changes:
+        return {}, {}
+    content, conditions = {"data": {}}, {}
+    if not all(change["op"] == "set" and change["path"] in ("data", "data.skills") for change in changes):
+        current = await db.db.portfolios.find_one(owner, {"data.skills": 1})
+        if current is None:
+            # The write misses as well and reports the missing portfolio
+            return {}, {}
+        skills = (current.get("data") or {}).get("skills")
+        content["data"]["skills"] = copy.deepcopy(skills or [])
+        # Under $and so a test of the whole array still applies
+        conditions["$and"] = [{"data.skills": skills}]
+    apply_changes(content, changes)
+    return {"skills_normalized": normalize_skills(content["data"].get("skills") or [])}, conditions
+
+@app.patch("/portfolios/{unique_identifier}", response_model=SuccessResponse, tags=["Portfolios"])
+async def patch_portfolio(
+    unique_identifier: str,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    expected_updated_at: Optional[datetime] = Query(
+        None, description="updated_at the patch was based on; a newer write fails with 412"
+    ),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """
+    Partially update portfolio
+    
+    Send an RFC 7386 merge patch as application/merge-patch+json, or RFC 6902
+    operations as application/json-patch+json, against {"data": ..., "is_published": ...}.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in (MERGE_PATCH_CONTENT_TYPE, JSON_PATCH_CONTENT_TYPE, "application/json"):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Use {MERGE_PATCH_CONTENT_TYPE} or {JSON_PATCH_CONTENT_TYPE}"
+        )
+    try:
+        patch = await request.json()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid JSON body"
+        )
+    
+    if content_type == JSON_PATCH_CONTENT_TYPE:
+        update, conditions = json_patch_update(patch)
+    else:
+        update, conditions = merge_patch_update(patch)
+    if not update:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Patch changes nothing"
+        )
+    
+    try:
+        owner = {"unique_identifier": unique_identifier, "user_id": current_user.id}
+        skills_fields, skills_conditions = await _patched_skills_normalized(owner, update)
+        update.setdefault("$set", {}).update(skills_fields)
+        update["$set"]["updated_at"] = datetime.utcnow()
+        update["$inc"] = {"revision": 1}
+        query = {**owner, **conditions, **skills_conditions}
+        if expected_updated_at is not None:
+            query["updated_at"] = expected_updated_at
+        
+        try:
+            portfolio = await db.db.portfolios.find_one_and_update(
+                query, update, return_document=ReturnDocument.AFTER
+            )
+        except OperationFailure as e:
+            # e.g. $push onto a field that is not an array in this document
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Patch cannot be applied: {e.details.get('errmsg') if e.details else e}"
+            )
+        
+        if portfolio is None:
+            # Only failed patches pay for telling a missing portfolio from a failed precondition
+            exists = await db.db.portfolios.find_one(owner, {"_id": 1})
+            if not exists:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Portfolio not found or access denied"
+                )
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Portfolio changed concurrently or since expected_updated_at, a test operation failed, "
+                       "an array index is out of range, or a removed array value occurs more than once"
+            )
+        
+        # The update operators are already a delta against the previous revision
+        await record_revision(portfolio, "patch", update_changes(update))
+        await _after_portfolio_update(portfolio, background_tasks)
+        
+        return SuccessResponse(
+            message="Portfolio updated successfully",
+            data={"updated_at": portfolio["updated_at"], "revision": portfolio["revision"]}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to update portfolio: {str(e)}"
+        )
+
+async def _owned_portfolio(unique_identifier: str, user_id) -> dict:
+    """The owner's portfolio, with only its revision number, or 404"""
+    portfolio = await db.db.portfolios.find_one(
+        {"unique_identifier": unique_identifier, "user_id": user_id},
+        {"revision": 1}
+    )
+    if not portfolio:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found or access denied"
+        )
+    return portfolio
+
+async def _read_revision_or_404(unique_identifier: str, number: int) -> dict:
+    revision = await read_revision(unique_identifier, number)
+    if revision is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Revision {number} not found"
+        )
+    return revision
+
+@app.get("/portfolios/{unique_identifier}/revisions", response_model=PortfolioRevisionPage, tags=["Revisions"])
+async def get_portfolio_revisions(
+    unique_identifier: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[int] = Query(None, description="next_before from the previous page"),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """
+    List revisions of a portfolio, newest first (for owner)
+    """
+    try:
+        await _owned_portfolio(unique_identifier, current_user.id)
+        items = await list_revisions(unique_identifier, limit + 1, before)
+        next_before = items[limit - 1]["number"] if len(items) > limit else None
+        return PortfolioRevisionPage(items=items[:limit], next_before=next_before)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch revisions: {str(e)}"
+        )
+
+@app.get("/portfolios/{unique_identifier}/revisions/{number}", response_model=PortfolioRevisionContent, tags=["Revisions"])
+async def get_portfolio_revision(
+    unique_identifier: str,
+    number: int,
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """
+    Get the content of one revision (for owner)
+    
+    Rebuilt from the nearest full snapshot and the deltas after it.
+    """
+    try:
+        await _owned_portfolio(unique_identifier, current_user.id)
+        return PortfolioRevisionContent(**await _read_revision_or_404(unique_identifier, number))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch revision: {str(e)}"
+        )
+
+@app.get("/portfolios/{unique_identifier}/revisions/{number}/diff", response_model=PortfolioRevisionDiff, tags=["Revisions"])
+async def get_portfolio_revision_diff(
+    unique_identifier: str,
+    number: int,
+    to: Optional[int] = Query(None, description="Revision to compare with; defaults to the latest"),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """
+    Get the changes that turn one revision into another (for owner)
+    """
+    try:
+        portfolio = await _owned_portfolio(unique_identifier, current_user.id)
+        to = portfolio.get("revision", 0) if to is None else to
+        old = await _read_revision_or_404(unique_identifier, number)
+        new = await _read_revision_or_404(unique_identifier, to)
+        return PortfolioRevisionDiff(
+            from_revision=number,
+            to_revision=to,
+            changes=diff_content(old, new)
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to diff revisions: {str(e)}"
+        )
+
+@app.post("/portfolios/{unique_identifier}/revisions/{number}/restore", response_model=SuccessResponse, tags=["Revisions"])
+async def restore_portfolio_revision(
+    unique_identifier: str,
+    number: int,
+    background_tasks: BackgroundTasks,
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """
+    Restore the data of an earlier revision (for owner)
+    
+    The restore is recorded as a new revision, so it can be undone the same
+    way. Publishing state is left as it is.
+    """
+    try:
+        await _owned_portfolio(unique_identifier, current_user.id)
+        revision = await _read_revision_or_404(unique_identifier, number)
+        
+        update_dict = {
+            "data": revision["data"],
+            "skills_normalized": normalize_skills(revision["data"].get("skills") or []),
+            "updated_at": datetime.utcnow()
+        }
+        portfolio = await _set_portfolio_fields(
+            unique_identifier, current_user.id, update_dict, "restore", restored_from=number
+        )
+        if portfolio is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Portfolio not found or access denied"
+            )
+        await _after_portfolio_update(portfolio, background_tasks)
+        
+        return SuccessResponse(
+            message=f"Portfolio restored to revision {number}",
+            data={"updated_at": portfolio["updated_at"], "revision": portfolio["revision"]}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to restore revision: {str(e)}"
+        )
+
 @app.delete("/portfolios/{unique_identifier}", response_model=SuccessResponse, tags=["Portfolios"])
 async def delete_portfolio(
     unique_identifier: str,
-    current_user: User = Depends(get_current_active_user)
+    background_tasks: BackgroundTasks,
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
     Delete portfolio
     """
     try:
-        # Find and delete portfolio
-        result = await db.db.portfolios.delete_one({
-            "unique_identifier": unique_identifier,
-            "user_id": current_user.id
-        })
+        owner = {"unique_identifier": unique_identifier, "user_id": current_user.id}
+        if not await db.db.portfolios.find_one(owner, {"_id": 1}):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Portfolio not found or access denied"
+            )
+        # Public copy first: if this fails, the portfolio still exists and a retry can finish
+        await remove_public_portfolio(unique_identifier)
+        result = await db.db.portfolios.delete_one(owner)
         
         if result.deleted_count == 0:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Portfolio not found or access denied"
             )
+        await db.db.portfolio_revisions.delete_many({"unique_identifier": unique_identifier})
+        portfolio_cache.invalidate(unique_identifier)
+        background_tasks.add_task(remove_snapshots, unique_identifier)
         
         # Remove from user's portfolio list
-        await db.db.users.update_one(
-            {"_id": current_user.id},
-            {"$pull": {"portfolios": unique_identifier}}
-        )
+        if DENORMALIZE_USER_PORTFOLIOS:
+            await db.db.users.update_one(
+                {"_id": current_user.id},
+                {"$pull": {"portfolios": unique_identifier}}
+            )
         
         return SuccessResponse(
             message="Portfolio deleted successfully"
@@ -441,12 +1294,15 @@ async def delete_portfolio(
         )
 
 # Admin endpoints
-@app.get("/admin/users", response_model=List[UserResponse], tags=["Admin"])
+@app.get("/admin/users", response_model=UserPage, tags=["Admin"])
 async def get_all_users(
-    current_user: User = Depends(get_current_active_user)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated response fields"),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
-    Get all users (admin only)
+    Get users, one page at a time (admin only)
     """
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
@@ -454,13 +1310,36 @@ async def get_all_users(
             detail="Admin access required"
         )
     
+    selected = parse_fields(fields, UserResponse.__fields__)
+    after_id = decode_cursor(cursor)
+    
     try:
-        users = []
-        async for user in db.db.users.find():
-            user["id"] = str(user["_id"])
-            users.append(UserResponse(**user))
+        query = {}
+        if after_id is not None:
+            query["_id"] = {"$gt": after_id}
+        
+        # Never load password hashes; the portfolios array only when asked for
+        include_portfolios = selected is None or "portfolios" in selected
+        projection = dict(PRINCIPAL_PROJECTION)
+        if include_portfolios and DENORMALIZE_USER_PORTFOLIOS:
+            projection["portfolios"] = 1
         
-        return users
+        results = db.db.users.find(query, projection).sort("_id", 1).limit(limit + 1)
+        docs = await results.to_list(length=limit + 1)
+        users = docs[:limit]
+        
+        if include_portfolios and not DENORMALIZE_USER_PORTFOLIOS:
+            portfolio_ids = await _get_user_portfolio_ids([user["_id"] for user in users])
+        else:
+            portfolio_ids = {user["_id"]: user.get("portfolios", []) for user in users}
+        
+        items = []
+        for user in users:
+            response = _user_response(Principal(**user), portfolio_ids[user["_id"]])
+            items.append(response.dict(include=set(selected)) if selected else response)
+        
+        next_cursor = encode_cursor(docs[limit - 1]["_id"]) if len(docs) > limit else None
+        return UserPage(items=items, next_cursor=next_cursor)
         
     except Exception as e:
         raise HTTPException(
@@ -468,6 +1347,83 @@ async def get_all_users(
             detail=f"Failed to fetch users: {str(e)}"
         )
 
+def _export_response(cursor, transform, name: str, batch_size: int, compress: bool):
+    """Stream a cursor as an NDJSON (optionally gzip) download."""
+    filename = f"{name}-{datetime.utcnow():%Y%m%dT%H%M%SZ}.ndjson"
+    media_type = "application/x-ndjson"
+    if compress:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        stream_ndjson(cursor, transform, batch_size, compress),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+def _export_portfolio(portfolio: dict) -> dict:
+    normalized = _normalize_portfolio_doc(portfolio)
+    normalized.pop("_id")
+    return normalized
+
+def _export_user(user: dict) -> dict:
+    user["id"] = str(user.pop("_id"))
+    return user
+
+@app.get("/admin/export/portfolios", tags=["Admin"])
+async def export_portfolios(
+    batch_size: int = Query(DEFAULT_EXPORT_BATCH_SIZE, ge=1, le=MAX_EXPORT_BATCH_SIZE),
+    gzip: bool = Query(False, description="gzip-compress the stream"),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """
+    Stream all portfolios as NDJSON (admin only)
+    """
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    cursor = db.db.portfolios.find({}).sort("_id", 1)
+    return _export_response(cursor, _export_portfolio, "portfolios", batch_size, gzip)
+
+@app.get("/admin/export/users", tags=["Admin"])
+async def export_users(
+    batch_size: int = Query(DEFAULT_EXPORT_BATCH_SIZE, ge=1, le=MAX_EXPORT_BATCH_SIZE),
+    gzip: bool = Query(False, description="gzip-compress the stream"),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """
+    Stream all users as NDJSON without password hashes (admin only)
+    """
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    cursor = db.db.users.find({}, {"hashed_password": 0}).sort("_id", 1)
+    return _export_response(cursor, _export_user, "users", batch_size, gzip)
+
+@app.get("/admin/cache", tags=["Admin"])
+async def get_cache_stats(
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """
+    Get in-process cache counters (admin only)
+    """
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    return {
+        "portfolios": portfolio_cache.stats(),
+        "principals": principal_cache.stats(),
+        "tokens": token_cache.stats()
+    }
+
 # Error handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
@@ -477,11 +1433,15 @@ async def http_exception_handler(request, exc):
             "success": False,
             "message": exc.detail,
             "data": None
-        }
+        },
+        # Keeps Retry-After on 503s and WWW-Authenticate on 401s
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
+    print(f"Unhandled error on {request.method} {request.url.path}:")
+    traceback.print_exception(exc)
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
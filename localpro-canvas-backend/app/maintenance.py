@@ -0,0 +1,77 @@
+"""
+Jobs that work on whole collections and must run in one process per deployment.
+
+These are the startup backfills, the view rollups, the revision compaction
+and the skill facet aggregation. With RUN_MAINTENANCE_TASKS (the default)
+the app lifespan runs them in the serving process. The production launcher
+turns the setting off for its workers and runs them in one separate
+maintenance process instead. With several launchers or containers, set
+RUN_MAINTENANCE_TASKS=false on all but one of them.
+"""
+import asyncio
+import os
+import signal
+from typing import Optional
+from dotenv import load_dotenv
+from .analytics import view_rollups
+from .database import db
+from .public_portfolios import run_public_backfill
+from .revisions import backfill_revisions, revision_compactor
+from .search import backfill_search_fields, skill_facets
+
+load_dotenv()
+
+RUN_MAINTENANCE_TASKS = os.getenv("RUN_MAINTENANCE_TASKS", "true").lower() == "true"
+
+_backfills: Optional[asyncio.Task] = None
+
+async def run_backfills():
+    """One-off backfills for documents written before a feature existed; retried on the next start"""
+    try:
+        await backfill_search_fields()
+    except Exception as e:
+        print(f"Failed to backfill search fields: {e}")
+    try:
+        await backfill_revisions()
+    except Exception as e:
+        print(f"Failed to backfill revision history: {e}")
+    await run_public_backfill()
+
+async def start_maintenance():
+    """Start the backfills and the periodic maintenance tasks"""
+    global _backfills
+    _backfills = asyncio.create_task(run_backfills())
+    skill_facets.compute = True
+    await skill_facets.start()
+    await view_rollups.start()
+    await revision_compactor.start()
+
+async def stop_maintenance():
+    """Stop the maintenance tasks; an unfinished backfill resumes on the next start"""
+    global _backfills
+    if _backfills is not None:
+        _backfills.cancel()
+        await asyncio.gather(_backfills, return_exceptions=True)
+        _backfills = None
+    await skill_facets.stop()
+    await view_rollups.stop()
+    await revision_compactor.stop()
+
+async def _maintain():
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+    try:
+        await db.connect_to_mongo()
+    except Exception as exc:
+        # The tasks log their own failures and retry on their interval
+        print(f"MongoDB unavailable at startup: {exc}")
+    await start_maintenance()
+    await stopping.wait()
+    await stop_maintenance()
+    await db.close_mongo_connection()
+
+def run_maintenance():
+    """Entry point of the maintenance process the launcher starts next to its workers"""
+    asyncio.run(_maintain())
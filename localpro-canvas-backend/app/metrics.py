@@ -0,0 +1,283 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+from pymongo import monitoring
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(labelnames: Tuple[str, ...], labels: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def total(self) -> float:
+        """Sum over all label combinations"""
+        with self._lock:
+            return sum(self._values.values())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    def dec(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+    def set(self, labels: Tuple[str, ...], value: float):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+class Histogram:
+    """Cumulative histogram with labels, rendered in Prometheus text format"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(series[0]), series[1], series[2])
+                        for labels, series in self._series.items()]
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+class Registry:
+    """Collection of metrics rendered together on /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status",
+    ("method", "route", "status")
+))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ("method", "route")
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+))
+mongo_commands = registry.register(Counter(
+    "mongodb_commands_total", "MongoDB commands by collection, operation and outcome",
+    ("collection", "command", "outcome")
+))
+mongo_command_duration = registry.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency by collection and operation",
+    ("collection", "command")
+))
+
+mongo_pool_checkout_duration = registry.register(Histogram(
+    "mongodb_pool_checkout_duration_seconds", "Time spent waiting to check out a pooled connection",
+    ("address", "outcome")
+))
+mongo_pool_checkout_failures = registry.register(Counter(
+    "mongodb_pool_checkout_failures_total", "Failed connection checkouts by reason",
+    ("address", "reason")
+))
+mongo_pool_waiting = registry.register(Gauge(
+    "mongodb_pool_checkouts_waiting", "Operations waiting for a pooled connection",
+    ("address",)
+))
+mongo_pool_connections = registry.register(Gauge(
+    "mongodb_pool_connections", "Open pooled connections, idle or in use",
+    ("address",)
+))
+mongo_pool_in_use = registry.register(Gauge(
+    "mongodb_pool_connections_in_use", "Pooled connections checked out by operations",
+    ("address",)
+))
+mongo_pool_max_size = registry.register(Gauge(
+    "mongodb_pool_max_size", "Configured maxPoolSize; utilization is in_use / max_size",
+    ("address",)
+))
+mongo_pool_cleared = registry.register(Counter(
+    "mongodb_pool_cleared_total", "Times a pool was cleared after a network or server error",
+    ("address",)
+))
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status codes and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            # Label by route template, not the raw path, to keep cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            method = scope["method"]
+            http_request_duration.observe((method, route), time.perf_counter() - started)
+            http_requests.inc((method, route, str(status_code)))
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Time every MongoDB command by collection and operation"""
+
+    def __init__(self):
+        # (connection, request_id) -> collection name, filled in by started events
+        self._collections: Dict[tuple, str] = {}
+
+    def started(self, event):
+        # getMore carries the cursor id under its own name and the collection separately
+        key = "collection" if event.command_name == "getMore" else event.command_name
+        value = event.command.get(key)
+        collection = value if isinstance(value, str) else "<none>"
+        self._collections[(event.connection_id, event.request_id)] = collection
+
+    def succeeded(self, event):
+        self._record(event, "success")
+
+    def failed(self, event):
+        self._record(event, "failure")
+
+    def _record(self, event, outcome: str):
+        collection = self._collections.pop((event.connection_id, event.request_id), "<none>")
+        mongo_command_duration.observe((collection, event.command_name), event.duration_micros / 1e6)
+        mongo_commands.inc((collection, event.command_name, outcome))
+
+# Command listener instance, registered on the Motor client
+mongo_command_listener = MongoCommandListener()
+
+def _address(address) -> str:
+    host, port = address
+    return f"{host}:{port}"
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Track pool size, utilization and checkout waits from CMAP events"""
+
+    def __init__(self):
+        # Configured maxPoolSize, set by the client options; events omit it when it is the driver default
+        self.max_pool_size: Optional[int] = None
+
+    def pool_created(self, event):
+        address = (_address(event.address),)
+        max_size = event.options.get("maxPoolSize", self.max_pool_size)
+        if max_size:
+            mongo_pool_max_size.set(address, max_size)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        mongo_pool_cleared.inc((_address(event.address),))
+
+    def pool_closed(self, event):
+        # Closing emits connection_closed, checked_in and check_out_failed for every
+        # connection and waiter, which bring the gauges back to zero on their own
+        pass
+
+    def connection_created(self, event):
+        mongo_pool_connections.inc((_address(event.address),))
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        mongo_pool_connections.dec((_address(event.address),))
+
+    def connection_check_out_started(self, event):
+        mongo_pool_waiting.inc((_address(event.address),))
+
+    def connection_check_out_failed(self, event):
+        address = _address(event.address)
+        mongo_pool_waiting.dec((address,))
+        mongo_pool_checkout_failures.inc((address, event.reason))
+        if event.duration is not None:
+            mongo_pool_checkout_duration.observe((address, "failure"), event.duration)
+
+    def connection_checked_out(self, event):
+        address = _address(event.address)
+        mongo_pool_waiting.dec((address,))
+        mongo_pool_in_use.inc((address,))
+        if event.duration is not None:
+            mongo_pool_checkout_duration.observe((address, "success"), event.duration)
+
+    def connection_checked_in(self, event):
+        mongo_pool_in_use.dec((_address(event.address),))
+
+# Pool listener instance, registered on the Motor client
+mongo_pool_listener = MongoPoolListener()
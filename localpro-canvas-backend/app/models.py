@@ -53,6 +53,31 @@ class User(BaseModel):
             }
         }
 
+class Principal(BaseModel):
+    """Authenticated user without the password hash or portfolios array"""
+    id: Optional[Any] = Field(alias="_id", default=None)
+    email: EmailStr
+    username: Optional[str] = None
+    full_name: Optional[str] = None
+    is_active: bool = True
+    is_verified: bool = False
+    role: UserRole = UserRole.USER
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Config:
+        arbitrary_types_allowed = True
+
+# Fields loaded from the users collection to build a Principal
+PRINCIPAL_PROJECTION = {
+    "email": 1,
+    "username": 1,
+    "full_name": 1,
+    "is_active": 1,
+    "is_verified": 1,
+    "role": 1,
+    "created_at": 1,
+}
+
 class Portfolio(BaseModel):
     id: Optional[Any] = Field(alias="_id", default=None)
     unique_identifier: str  # Unique URL identifier
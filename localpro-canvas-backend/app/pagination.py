@@ -0,0 +1,59 @@
+import base64
+from typing import Iterable, List, Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, status
+
+# Page size limits for list endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(last_id: ObjectId) -> str:
+    """Encode the last _id of a page as an opaque cursor"""
+    return base64.urlsafe_b64encode(last_id.binary).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[ObjectId]:
+    """Decode a cursor produced by encode_cursor"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return ObjectId(base64.urlsafe_b64decode(padded.encode()))
+    except (InvalidId, ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def encode_offset_cursor(offset: int) -> str:
+    """Encode a position in a ranked result list, for orders no key can resume"""
+    return base64.urlsafe_b64encode(f"offset:{offset}".encode()).decode().rstrip("=")
+
+def decode_offset_cursor(cursor: Optional[str]) -> int:
+    """Decode a cursor produced by encode_offset_cursor"""
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, offset = base64.urlsafe_b64decode(padded.encode()).decode().split(":")
+        if prefix != "offset" or not offset.isdigit():
+            raise ValueError(cursor)
+        return int(offset)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """Parse a comma-separated fields= parameter against the allowed response fields"""
+    if not fields:
+        return None
+    requested = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = set(requested) - set(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    return requested or None
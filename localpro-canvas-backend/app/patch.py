@@ -0,0 +1,210 @@
+from typing import Any, Dict, List, Optional, Tuple, Type, get_origin
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ValidationError
+from .models import PortfolioData
+
+MERGE_PATCH_CONTENT_TYPE = "application/merge-patch+json"
+JSON_PATCH_CONTENT_TYPE = "application/json-patch+json"
+
+# Translate JSON merge patches (RFC 7386) and JSON patches (RFC 6902) into
+# targeted update operators; only the touched fields are validated and written
+
+class PatchTarget(BaseModel):
+    """Editable fields of a portfolio, the document patches apply to"""
+    data: PortfolioData
+    is_published: bool
+
+def _bad_patch(detail: str):
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+def _is_model(annotation) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+def _is_list(annotation) -> bool:
+    return get_origin(annotation) in (list, List)
+
+def _validate(model: Type[BaseModel], field: str, value: Any, path: str) -> Any:
+    """Validate one field of a model without building the rest of it"""
+    instance = model.model_construct()
+    try:
+        model.__pydantic_validator__.validate_assignment(instance, field, value)
+    except ValidationError as e:
+        raise _bad_patch(f"Invalid value for {path}: {e.errors()[0]['msg']}")
+    value = getattr(instance, field)
+    if isinstance(value, BaseModel):
+        return value.dict()
+    if isinstance(value, list):
+        return [item.dict() if isinstance(item, BaseModel) else item for item in value]
+    return value
+
+def _validate_item(model: Type[BaseModel], field: str, value: Any, path: str) -> Any:
+    """Validate one element of a list field"""
+    return _validate(model, field, [value], path)[0]
+
+def _parse_pointer(pointer: Any) -> List[str]:
+    if not isinstance(pointer, str) or not pointer.startswith("/"):
+        raise _bad_patch(f"Invalid JSON pointer: {pointer!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+def _resolve(tokens: List[str], pointer: str) -> Tuple[Type[BaseModel], str, List[str], Optional[str]]:
+    """
+    Find the model field a pointer addresses.
+
+    Returns (model, field, Mongo path of the field, array index or "-" or None).
+    """
+    model, path = PatchTarget, []
+    for position, token in enumerate(tokens):
+        field = model.model_fields.get(token)
+        if field is None:
+            raise _bad_patch(f"Unknown field in {pointer}")
+        path.append(token)
+        rest = tokens[position + 1:]
+        if not rest:
+            return model, token, path, None
+        if _is_model(field.annotation):
+            model = field.annotation
+            continue
+        if _is_list(field.annotation) and len(rest) == 1:
+            index = rest[0]
+            if index != "-" and not (index.isdigit() and (index == "0" or not index.startswith("0"))):
+                raise _bad_patch(f"Invalid array index in {pointer}")
+            return model, token, path, index
+        raise _bad_patch(f"Invalid path {pointer}")
+    raise _bad_patch("The whole document cannot be patched; address a field")
+
+class _UpdateBuilder:
+    """Collect update operators, refusing operations whose paths overlap"""
+
+    def __init__(self):
+        self.update: Dict[str, dict] = {}
+        self.conditions: Dict[str, Any] = {}
+        self._claimed: Dict[str, str] = {}
+
+    def _claim(self, path: str, operator: str):
+        for claimed, claimed_operator in self._claimed.items():
+            overlaps = path == claimed or path.startswith(claimed + ".") or claimed.startswith(path + ".")
+            # Several appends to one array merge into a single $push
+            if overlaps and not (path == claimed and operator == claimed_operator == "$push"):
+                raise _bad_patch(f"Conflicting operations on {path}")
+        self._claimed[path] = operator
+
+    def set(self, path: str, value: Any):
+        self._claim(path, "$set")
+        self.update.setdefault("$set", {})[path] = value
+
+    def unset(self, path: str):
+        self._claim(path, "$unset")
+        self.update.setdefault("$unset", {})[path] = ""
+
+    def push(self, path: str, value: Any, position: Optional[int] = None):
+        self._claim(path, "$push")
+        entry = self.update.setdefault("$push", {}).setdefault(path, {"$each": []})
+        # Appends can share one $push, an insert at an index cannot
+        if entry["$each"] and (position is not None or "$position" in entry):
+            raise _bad_patch(f"Conflicting operations on {path}")
+        entry["$each"].append(value)
+        if position is not None:
+            entry["$position"] = position
+
+    def require(self, path: str):
+        """Only match documents where the array element at path exists"""
+        # MongoDB pads an array with nulls when setting past its end
+        self.conditions.setdefault(path, {"$exists": True})
+
+    def pull(self, path: str, value: Any):
+        """Remove one element by value; the write only matches if the value occurs exactly once"""
+        self._claim(path, "$pull")
+        self.update.setdefault("$pull", {})[path] = value
+        # $pull removes every equal element, so a duplicate would take its twins with it
+        occurrences = {"$size": {"$filter": {
+            "input": f"${path}",
+            "cond": {"$eq": ["$$this", value]}
+        }}}
+        self.conditions.setdefault("$expr", {"$and": []})["$and"].append({"$eq": [occurrences, 1]})
+
+def _merge(builder: _UpdateBuilder, model: Type[BaseModel], prefix: List[str], patch: Any):
+    if not isinstance(patch, dict):
+        raise _bad_patch("A merge patch must be a JSON object")
+    for key, value in patch.items():
+        field = model.model_fields.get(key)
+        path = prefix + [key]
+        dotted = ".".join(path)
+        if field is None:
+            raise _bad_patch(f"Unknown field {dotted}")
+        if value is None:
+            if field.is_required():
+                raise _bad_patch(f"{dotted} is required and cannot be removed")
+            builder.unset(dotted)
+        elif isinstance(value, dict) and _is_model(field.annotation):
+            _merge(builder, field.annotation, path, value)
+        else:
+            # Arrays and scalars are replaced as a whole, as RFC 7386 specifies
+            builder.set(dotted, _validate(model, key, value, dotted))
+
+def merge_patch_update(patch: Any) -> Tuple[Dict[str, dict], Dict[str, Any]]:
+    """Update operators for an RFC 7386 merge patch; returns (update, extra filter conditions)"""
+    builder = _UpdateBuilder()
+    _merge(builder, PatchTarget, [], patch)
+    return builder.update, builder.conditions
+
+def json_patch_update(operations: Any) -> Tuple[Dict[str, dict], Dict[str, Any]]:
+    """
+    Update operators for RFC 6902 operations; returns (update, extra filter conditions).
+
+    "test" becomes a filter condition, so it is checked atomically with the
+    write. Array indexes are checked the same way: the element replaced,
+    tested or removed must exist, and so must the one before an insert.
+    MongoDB cannot remove an array element by index, so "remove" of
+    an element needs a preceding "test" of the same path and pulls that
+    value, which must occur only once in the array. "move" and "copy" need the current document and are not supported.
+    """
+    if not isinstance(operations, list):
+        raise _bad_patch("A JSON patch must be an array of operations")
+
+    builder = _UpdateBuilder()
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise _bad_patch("Each JSON patch operation must be an object")
+        op, pointer = operation.get("op"), operation.get("path")
+        if op in ("move", "copy"):
+            raise _bad_patch(f"Unsupported operation: {op}")
+        if op not in ("add", "remove", "replace", "test"):
+            raise _bad_patch(f"Unknown operation: {op!r}")
+        if op != "remove" and "value" not in operation:
+            raise _bad_patch(f"Missing value for {op} {pointer}")
+
+        model, field, path, index = _resolve(_parse_pointer(pointer), pointer)
+        dotted = ".".join(path)
+        value = operation.get("value")
+
+        if op == "test":
+            if index is None:
+                builder.conditions[dotted] = _validate(model, field, value, dotted)
+            elif index != "-":
+                builder.conditions[f"{dotted}.{index}"] = _validate_item(model, field, value, dotted)
+            else:
+                raise _bad_patch(f"Cannot test {pointer}")
+        elif op == "add" and index is not None:
+            item = _validate_item(model, field, value, dotted)
+            if index not in ("-", "0"):
+                builder.require(f"{dotted}.{int(index) - 1}")
+            builder.push(dotted, item, None if index == "-" else int(index))
+        elif op in ("add", "replace"):
+            if index is None:
+                builder.set(dotted, _validate(model, field, value, dotted))
+            elif index != "-":
+                builder.set(f"{dotted}.{index}", _validate_item(model, field, value, dotted))
+                builder.require(f"{dotted}.{index}")
+            else:
+                raise _bad_patch(f"Cannot replace {pointer}")
+        elif index is None:
+            if model.model_fields[field].is_required():
+                raise _bad_patch(f"{dotted} is required and cannot be removed")
+            builder.unset(dotted)
+        else:
+            tested = f"{dotted}.{index}"
+            if tested not in builder.conditions:
+                raise _bad_patch(f"Removing {pointer} needs a preceding test of its value")
+            builder.pull(dotted, builder.conditions[tested])
+
+    return builder.update, builder.conditions
@@ -0,0 +1,214 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+from .cache import TTLCache, portfolio_cache
+from .database import db
+from .tasks import PeriodicTask
+
+load_dotenv()
+
+# Public reads of a portfolio go to the primary for this long after it changed,
+# so a lagging secondary cannot put the old version back into the cache
+PUBLIC_READ_PRIMARY_WINDOW_SECONDS = float(os.getenv("PUBLIC_READ_PRIMARY_WINDOW_SECONDS", 30))
+
+# Fields of a public_portfolios document, keyed by unique_identifier in _id;
+# updated_at is kept for conditional GETs, and portfolio_id (the owner
+# document's _id, for newest-first order) and skills_normalized for search.
+# None of those three are part of the response
+PUBLIC_SEARCH_FIELDS = ("portfolio_id", "skills_normalized")
+PUBLIC_FIELDS = ("unique_identifier", "template", "data", "is_published", "created_at", "views")
+PUBLIC_BACKFILL_BATCH_SIZE = 500
+
+# Every change to the read model is announced in public_changes, and each
+# worker polls it to drop its own cached copy; see PublicChangeFeed.
+# Announcements expire after an hour (TTL index in Database.create_indexes)
+PUBLIC_CHANGE_POLL_SECONDS = float(os.getenv("PUBLIC_CHANGE_POLL_SECONDS", 1))
+# Each poll re-reads this far back, for announcements that commit out of time order
+PUBLIC_CHANGE_OVERLAP_SECONDS = 5
+
+# Identifies this process in its own announcements
+WORKER_ID = uuid.uuid4().hex
+
+recent_public_writes = TTLCache(10000, PUBLIC_READ_PRIMARY_WINDOW_SECONDS)
+
+def public_reader(unique_identifier: str = None):
+    """Database handle for a public read, on the primary while the portfolio was just written"""
+    if db.public_db is None or (
+        unique_identifier is not None and recent_public_writes.get(unique_identifier)
+    ):
+        return db.db
+    return db.public_db
+
+def public_document(portfolio: dict) -> dict:
+    """Public read model of a published portfolio, in the /p/ response shape"""
+    document = {"_id": portfolio["unique_identifier"]}
+    document.update({field: portfolio.get(field) for field in PUBLIC_FIELDS})
+    document["views"] = document["views"] or 0
+    document["updated_at"] = portfolio.get("updated_at") or portfolio.get("created_at")
+    document["portfolio_id"] = portfolio["_id"]
+    document["skills_normalized"] = portfolio.get("skills_normalized") or []
+    return document
+
+async def announce_public_change(unique_identifier: str):
+    """Tell the other workers to drop their cached copy of a portfolio"""
+    try:
+        # Stamped with the server's clock so workers on different hosts agree on order
+        await db.db.public_changes.update_one(
+            {"_id": ObjectId()},
+            {
+                "$set": {"unique_identifier": unique_identifier, "worker": WORKER_ID},
+                "$currentDate": {"at": True}
+            },
+            upsert=True
+        )
+    except Exception as e:
+        # Other workers fall back to their cache TTL
+        print(f"Failed to announce public change of {unique_identifier}: {e}")
+
+async def sync_public_portfolio(portfolio: dict):
+    """Write or drop the public copy of a portfolio after its owner changed it"""
+    if not portfolio.get("is_published"):
+        await remove_public_portfolio(portfolio["unique_identifier"])
+        return
+    recent_public_writes.set(portfolio["unique_identifier"], True)
+    document = public_document(portfolio)
+    # views only seeds a new copy; the view counter $incs the existing one concurrently
+    views = document.pop("views")
+    await db.db.public_portfolios.update_one(
+        {"_id": document.pop("_id")},
+        {"$set": document, "$setOnInsert": {"views": views}},
+        upsert=True
+    )
+    await announce_public_change(portfolio["unique_identifier"])
+
+async def remove_public_portfolio(unique_identifier: str):
+    """Drop the public copy of an unpublished or deleted portfolio"""
+    recent_public_writes.set(unique_identifier, True)
+    await db.db.public_portfolios.delete_one({"_id": unique_identifier})
+    await announce_public_change(unique_identifier)
+
+class PublicChangeFeed(PeriodicTask):
+    """
+    Apply other workers' public read model changes to this worker's caches.
+
+    The cache and recent_public_writes are per process, so a write only
+    clears them in the worker that handled it. Polling public_changes
+    bounds what the other workers, on any host, serve stale to about one
+    poll interval, and sends their next read of the portfolio to the primary.
+    """
+
+    run_immediately = True
+
+    def __init__(self, interval: float = PUBLIC_CHANGE_POLL_SECONDS):
+        super().__init__(interval)
+        self._since: Optional[datetime] = None
+        # Announcements already applied within the overlap window
+        self._seen: Dict[ObjectId, datetime] = {}
+
+    async def setup(self):
+        """Start from the newest announcement, or now when there is none"""
+        try:
+            latest = await db.db.public_changes.find_one({}, {"at": 1}, sort=[("at", -1)])
+            self._since = latest["at"] if latest else datetime.utcnow()
+        except Exception as e:
+            print(f"Failed to read public changes: {e}")
+            self._since = datetime.utcnow()
+
+    async def run_once(self):
+        overlap = timedelta(seconds=PUBLIC_CHANGE_OVERLAP_SECONDS)
+        try:
+            cursor = db.db.public_changes.find(
+                {"at": {"$gte": self._since - overlap}}
+            ).sort("at", 1)
+            async for change in cursor:
+                self._since = max(self._since, change["at"])
+                if change["_id"] in self._seen:
+                    continue
+                self._seen[change["_id"]] = change["at"]
+                if change["worker"] != WORKER_ID:
+                    portfolio_cache.invalidate(change["unique_identifier"])
+                    recent_public_writes.set(change["unique_identifier"], True)
+        except Exception as e:
+            print(f"Failed to read public changes: {e}")
+        self._seen = {
+            change_id: at for change_id, at in self._seen.items() if at >= self._since - overlap
+        }
+
+# Public change feed instance
+public_change_feed = PublicChangeFeed()
+
+async def backfill_public_portfolios():
+    """Copy published portfolios that predate the read model, and add search fields to older copies"""
+    published = await db.db.portfolios.count_documents({"is_published": True})
+    unsearchable = await db.db.public_portfolios.count_documents({"portfolio_id": {"$exists": False}}, limit=1)
+    if await db.db.public_portfolios.estimated_document_count() >= published and not unsearchable:
+        return
+
+    copied = 0
+    operations = []
+    async for portfolio in db.db.portfolios.find({"is_published": True}):
+        # Never overwrite a copy that a newer write already made
+        document = public_document(portfolio)
+        unique_identifier = document.pop("_id")
+        operations.append(UpdateOne(
+            {"_id": unique_identifier},
+            {"$setOnInsert": document},
+            upsert=True
+        ))
+        # Copies made before search moved to the read model; every newer write sets both fields
+        operations.append(UpdateOne(
+            {"_id": unique_identifier, "portfolio_id": {"$exists": False}},
+            {"$set": {field: document[field] for field in PUBLIC_SEARCH_FIELDS}}
+        ))
+        copied += 1
+        if len(operations) >= PUBLIC_BACKFILL_BATCH_SIZE:
+            await db.db.public_portfolios.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        await db.db.public_portfolios.bulk_write(operations, ordered=False)
+    print(f"Backfilled {copied} public portfolios")
+
+async def _remove_orphans(identifiers: List[str], started: datetime) -> int:
+    published = {
+        portfolio["unique_identifier"] async for portfolio in db.db.portfolios.find(
+            {"unique_identifier": {"$in": identifiers}, "is_published": True},
+            {"unique_identifier": 1}
+        )
+    }
+    orphans = [unique_identifier for unique_identifier in identifiers if unique_identifier not in published]
+    if not orphans:
+        return 0
+    # A copy written after the scan started belongs to a portfolio published meanwhile
+    result = await db.db.public_portfolios.delete_many(
+        {"_id": {"$in": orphans}, "updated_at": {"$lt": started}}
+    )
+    for unique_identifier in orphans:
+        await announce_public_change(unique_identifier)
+    return result.deleted_count
+
+async def remove_orphaned_public_portfolios():
+    """Drop public copies whose portfolio was deleted or unpublished without removing them"""
+    started = datetime.utcnow()
+    removed = 0
+    identifiers = []
+    async for document in db.db.public_portfolios.find({}, {"_id": 1}):
+        identifiers.append(document["_id"])
+        if len(identifiers) >= PUBLIC_BACKFILL_BATCH_SIZE:
+            removed += await _remove_orphans(identifiers, started)
+            identifiers = []
+    if identifiers:
+        removed += await _remove_orphans(identifiers, started)
+    if removed:
+        print(f"Removed {removed} orphaned public portfolios")
+
+async def run_public_backfill():
+    """Startup task; a failed backfill is retried on the next start"""
+    try:
+        await backfill_public_portfolios()
+        await remove_orphaned_public_portfolios()
+    except Exception as e:
+        print(f"Failed to backfill public portfolios: {e}")
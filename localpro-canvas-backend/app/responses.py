@@ -0,0 +1,37 @@
+import json
+import os
+from datetime import datetime
+from typing import Any
+from bson import ObjectId
+from dotenv import load_dotenv
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+load_dotenv()
+
+# Return pre-built dicts encoded in one pass instead of validating response models
+FAST_RESPONSES = os.getenv("FAST_RESPONSES", "false").lower() == "true"
+
+def _default(value: Any):
+    """Encode values the JSON encoders do not handle natively"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def encode_json(content: Any) -> bytes:
+    """Compact JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson when available, skipping FastAPI's jsonable_encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
@@ -0,0 +1,317 @@
+import copy
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from dotenv import load_dotenv
+from .database import db
+from .tasks import PeriodicTask
+
+load_dotenv()
+
+# Revision history configuration
+REVISION_SNAPSHOT_INTERVAL = int(os.getenv("REVISION_SNAPSHOT_INTERVAL", 20))
+REVISION_RETENTION_COUNT = int(os.getenv("REVISION_RETENTION_COUNT", 100))
+REVISION_COMPACTION_INTERVAL_SECONDS = float(os.getenv("REVISION_COMPACTION_INTERVAL_SECONDS", 3600))
+
+SNAPSHOT = "snapshot"
+DELTA = "delta"
+
+# Portfolio fields a revision records; template cannot change after creation
+REVISION_FIELDS = ("data", "is_published")
+
+# A change is one of
+#   {"op": "set", "path": "data.about", "value": ...}
+#   {"op": "unset", "path": "data.updated_at"}
+#   {"op": "splice", "path": "data.skills", "index": 1, "remove": 1, "insert": [...]}
+#     on a list or a string; index None appends
+#   {"op": "pull", "path": "data.skills", "value": "Go"}
+#     removes one element; patches only pull values that occur once
+# with dotted paths like MongoDB's, so a change is as large as what it changes.
+
+def revision_content(portfolio: dict) -> dict:
+    """The fields of a portfolio that revisions record"""
+    return {field: portfolio.get(field) for field in REVISION_FIELDS}
+
+def _splice(path: str, old, new) -> dict:
+    """Replace the differing middle of two lists or strings"""
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return {
+        "op": "splice",
+        "path": path,
+        "index": prefix,
+        "remove": len(old) - prefix - suffix,
+        "insert": new[prefix:len(new) - suffix],
+    }
+
+def _diff(old: Any, new: Any, path: str) -> List[dict]:
+    if old == new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key, value in new.items():
+            child = f"{path}.{key}"
+            if key in old:
+                changes.extend(_diff(old[key], value, child))
+            else:
+                changes.append({"op": "set", "path": child, "value": value})
+        changes.extend({"op": "unset", "path": f"{path}.{key}"} for key in old if key not in new)
+        return changes
+    if isinstance(old, (list, str)) and type(old) is type(new):
+        return [_splice(path, old, new)]
+    return [{"op": "set", "path": path, "value": new}]
+
+def diff_content(old: dict, new: dict) -> List[dict]:
+    """Changes that turn one revision's content into another's"""
+    changes = []
+    for field in REVISION_FIELDS:
+        changes.extend(_diff(old.get(field), new.get(field), field))
+    return changes
+
+def update_changes(update: Dict[str, dict]) -> List[dict]:
+    """Changes made by a MongoDB update built from a patch, restricted to revision fields"""
+    def recorded(path: str) -> bool:
+        return path.split(".")[0] in REVISION_FIELDS
+
+    changes = []
+    for path, value in update.get("$set", {}).items():
+        if recorded(path):
+            changes.append({"op": "set", "path": path, "value": value})
+    for path in update.get("$unset", {}):
+        if recorded(path):
+            changes.append({"op": "unset", "path": path})
+    for path, push in update.get("$push", {}).items():
+        if recorded(path):
+            changes.append({
+                "op": "splice", "path": path,
+                "index": push.get("$position"), "remove": 0, "insert": push["$each"]
+            })
+    for path, value in update.get("$pull", {}).items():
+        if recorded(path):
+            changes.append({"op": "pull", "path": path, "value": value})
+    return changes
+
+def _step(container, token: str):
+    return container[int(token)] if isinstance(container, list) else container[token]
+
+def apply_changes(content: dict, changes: List[dict]) -> dict:
+    """Apply changes in place, with the semantics MongoDB gave them on write"""
+    for change in changes:
+        tokens = change["path"].split(".")
+        parent = content
+        for token in tokens[:-1]:
+            if isinstance(parent, dict):
+                parent = parent.setdefault(token, {})
+            else:
+                parent = parent[int(token)]
+        key = tokens[-1]
+        op = change["op"]
+
+        if op == "set" and isinstance(parent, list):
+            index = int(key)
+            # MongoDB pads with nulls when setting past the end of an array
+            parent.extend([None] * (index + 1 - len(parent)))
+            parent[index] = change["value"]
+        elif op == "set":
+            parent[key] = change["value"]
+        elif op == "unset":
+            if isinstance(parent, dict):
+                parent.pop(key, None)
+        elif op == "splice":
+            value = _step(parent, key)
+            index = len(value) if change["index"] is None else change["index"]
+            replaced = value[:index] + change["insert"] + value[index + change["remove"]:]
+            if isinstance(parent, list):
+                parent[int(key)] = replaced
+            else:
+                parent[key] = replaced
+        elif op == "pull":
+            value = _step(parent, key)
+            if change["value"] in value:
+                value.remove(change["value"])
+    return content
+
+async def record_revision(portfolio: dict, action: str, changes: Optional[List[dict]] = None,
+                          restored_from: Optional[int] = None):
+    """
+    Store the revision a write produced, given the portfolio after the write.
+
+    portfolio["revision"] must come from the same atomic write as the
+    changes. Every REVISION_SNAPSHOT_INTERVAL-th revision, and any
+    revision recorded without changes, stores the full content instead.
+    """
+    number = portfolio["revision"]
+    revision = {
+        "unique_identifier": portfolio["unique_identifier"],
+        "number": number,
+        "action": action,
+        "created_at": portfolio.get("updated_at") or datetime.utcnow(),
+    }
+    if restored_from is not None:
+        revision["restored_from"] = restored_from
+    if changes is None or (number - 1) % REVISION_SNAPSHOT_INTERVAL == 0:
+        revision["kind"] = SNAPSHOT
+        revision["content"] = revision_content(portfolio)
+    else:
+        revision["kind"] = DELTA
+        revision["changes"] = changes
+
+    try:
+        await db.db.portfolio_revisions.insert_one(revision)
+    except Exception as e:
+        # The write itself succeeded; history resumes at the next snapshot
+        print(f"Failed to record revision {number} of {portfolio['unique_identifier']}: {e}")
+
+def snapshot_revision(portfolio: dict) -> dict:
+    """Revision document for a newly created portfolio, for bulk inserts"""
+    return {
+        "unique_identifier": portfolio["unique_identifier"],
+        "number": portfolio["revision"],
+        "action": "create",
+        "created_at": portfolio["created_at"],
+        "kind": SNAPSHOT,
+        "content": revision_content(portfolio),
+    }
+
+def _summary(revision: dict) -> dict:
+    summary = {
+        "number": revision["number"],
+        "kind": revision["kind"],
+        "action": revision["action"],
+        "created_at": revision["created_at"],
+    }
+    if "restored_from" in revision:
+        summary["restored_from"] = revision["restored_from"]
+    if revision["kind"] == DELTA:
+        summary["changes"] = len(revision["changes"])
+    return summary
+
+async def list_revisions(unique_identifier: str, limit: int, before: Optional[int] = None) -> List[dict]:
+    """Summaries of a portfolio's revisions, newest first, without their content"""
+    query = {"unique_identifier": unique_identifier}
+    if before is not None:
+        query["number"] = {"$lt": before}
+    cursor = db.db.portfolio_revisions.find(
+        query, {"content": 0}
+    ).sort("number", -1).limit(limit)
+    return [_summary(revision) async for revision in cursor]
+
+async def read_revision(unique_identifier: str, number: int) -> Optional[dict]:
+    """
+    Content of one revision, or None when it was never recorded or is compacted away.
+
+    Reads the nearest snapshot at or before the revision and replays the
+    deltas after it, at most REVISION_SNAPSHOT_INTERVAL - 1 of them.
+    """
+    snapshot = await db.db.portfolio_revisions.find_one(
+        {"unique_identifier": unique_identifier, "kind": SNAPSHOT, "number": {"$lte": number}},
+        sort=[("number", -1)]
+    )
+    if snapshot is None:
+        return None
+
+    revision = snapshot
+    content = copy.deepcopy(snapshot["content"])
+    if snapshot["number"] < number:
+        cursor = db.db.portfolio_revisions.find({
+            "unique_identifier": unique_identifier,
+            "number": {"$gt": snapshot["number"], "$lte": number}
+        }).sort("number", 1)
+        expected = snapshot["number"] + 1
+        async for revision in cursor:
+            # A revision that failed to record breaks the chain until the next snapshot
+            if revision["number"] != expected:
+                return None
+            apply_changes(content, revision["changes"])
+            expected += 1
+        if revision["number"] != number:
+            return None
+
+    return {**_summary(revision), **content}
+
+async def backfill_revisions():
+    """Record a first snapshot for portfolios created before revision history existed"""
+    recorded = 0
+    cursor = db.db.portfolios.find({"revision": {"$exists": False}}, {"_id": 1})
+    async for legacy in cursor:
+        # Claiming revision 1 and reading its content is one atomic step,
+        # so a concurrent edit either comes after it or records revision 1 itself
+        portfolio = await db.db.portfolios.find_one_and_update(
+            {"_id": legacy["_id"], "revision": {"$exists": False}},
+            {"$set": {"revision": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if portfolio is None:
+            continue
+        try:
+            await db.db.portfolio_revisions.insert_one({
+                **snapshot_revision(portfolio),
+                "action": "backfill",
+                "created_at": portfolio.get("updated_at") or portfolio.get("created_at") or datetime.utcnow(),
+            })
+            recorded += 1
+        except DuplicateKeyError:
+            pass
+    if recorded:
+        print(f"Backfilled revision history for {recorded} portfolios")
+
+class RevisionCompactor(PeriodicTask):
+    """Keep a bounded number of revisions per portfolio"""
+
+    run_immediately = True
+
+    def __init__(self, interval: float = REVISION_COMPACTION_INTERVAL_SECONDS,
+                 retention: int = REVISION_RETENTION_COUNT):
+        super().__init__(interval)
+        self.retention = retention
+        self.last_run: Optional[datetime] = None
+
+    async def compact_portfolio(self, unique_identifier: str, head: int) -> int:
+        """
+        Delete the revisions before the newest snapshot that still leaves `retention` revisions.
+
+        Cutting at a snapshot keeps every remaining revision readable without
+        rewriting any of them; between retention and retention +
+        REVISION_SNAPSHOT_INTERVAL - 1 revisions are kept.
+        """
+        cutoff = head - self.retention + 1
+        snapshot = await db.db.portfolio_revisions.find_one(
+            {"unique_identifier": unique_identifier, "kind": SNAPSHOT, "number": {"$lte": cutoff}},
+            {"number": 1},
+            sort=[("number", -1)]
+        )
+        if snapshot is None:
+            return 0
+        result = await db.db.portfolio_revisions.delete_many(
+            {"unique_identifier": unique_identifier, "number": {"$lt": snapshot["number"]}}
+        )
+        return result.deleted_count
+
+    async def compact(self):
+        """Compact every portfolio with more revisions than the retention, found through the revision index"""
+        deleted = 0
+        cursor = db.db.portfolios.find(
+            {"revision": {"$gt": self.retention}},
+            {"unique_identifier": 1, "revision": 1}
+        )
+        async for portfolio in cursor:
+            deleted += await self.compact_portfolio(portfolio["unique_identifier"], portfolio["revision"])
+        if deleted:
+            print(f"Compacted {deleted} portfolio revisions")
+
+    async def run_once(self):
+        try:
+            await self.compact()
+            self.last_run = datetime.utcnow()
+        except Exception as e:
+            print(f"Failed to compact portfolio revisions: {e}")
+
+# Revision compactor instance
+revision_compactor = RevisionCompactor()
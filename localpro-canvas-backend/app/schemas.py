@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, validator
-from typing import Optional, List
+from typing import Optional, List, Dict, Union
 from datetime import datetime
 
 # User schemas
@@ -75,6 +75,66 @@ class PortfolioPublicResponse(BaseModel):
     views: int
     created_at: datetime
 
+# Batch public lookup; identifiers that are missing or unpublished map to None
+class PortfolioBatchRequest(BaseModel):
+    identifiers: List[str]
+
+class PortfolioBatchResponse(BaseModel):
+    portfolios: Dict[str, Optional[PortfolioPublicResponse]]
+
+# View analytics for an owner's portfolio
+class ViewBucket(BaseModel):
+    start: datetime
+    views: int
+
+class PortfolioStatsResponse(BaseModel):
+    unique_identifier: str
+    granularity: str
+    total: int
+    buckets: List[ViewBucket]
+
+# Paginated list responses; items are plain dicts when fields= is given
+class PortfolioPage(BaseModel):
+    items: List[Union[PortfolioResponse, dict]]
+    next_cursor: Optional[str] = None
+
+class UserPage(BaseModel):
+    items: List[Union[UserResponse, dict]]
+    next_cursor: Optional[str] = None
+
+# Search results; facets are the top skills over all published portfolios
+class SkillFacet(BaseModel):
+    skill: str
+    count: int
+
+class PortfolioSearchPage(BaseModel):
+    items: List[PortfolioPublicResponse]
+    next_cursor: Optional[str] = None
+    facets: List[SkillFacet] = []
+    facets_refreshed_at: Optional[datetime] = None
+
+# Revision history; changes counts the changes stored by a delta revision
+class PortfolioRevision(BaseModel):
+    number: int
+    kind: str
+    action: str
+    created_at: datetime
+    restored_from: Optional[int] = None
+    changes: Optional[int] = None
+
+class PortfolioRevisionPage(BaseModel):
+    items: List[PortfolioRevision]
+    next_before: Optional[int] = None
+
+class PortfolioRevisionContent(PortfolioRevision):
+    data: dict
+    is_published: bool
+
+class PortfolioRevisionDiff(BaseModel):
+    from_revision: int
+    to_revision: int
+    changes: List[dict]
+
 # Success response
 class SuccessResponse(BaseModel):
     success: bool = True
@@ -0,0 +1,110 @@
+import os
+from datetime import datetime
+from typing import Iterable, List, Optional
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+from .database import db
+from .public_portfolios import public_reader
+from .tasks import PeriodicTask
+
+load_dotenv()
+
+# Search configuration
+SKILL_FACETS_REFRESH_SECONDS = float(os.getenv("SKILL_FACETS_REFRESH_SECONDS", 300))
+SKILL_FACETS_LIMIT = int(os.getenv("SKILL_FACETS_LIMIT", 20))
+SEARCH_BACKFILL_BATCH_SIZE = 500
+
+def normalize_skill(skill: str) -> str:
+    """Lowercase a skill and collapse its whitespace"""
+    return " ".join(skill.split()).lower()
+
+def normalize_skills(skills: Iterable[str]) -> List[str]:
+    """Distinct normalized skills, as stored in portfolios.skills_normalized"""
+    # Skip anything but strings, e.g. nulls MongoDB padded an array with
+    return sorted({
+        normalize_skill(skill) for skill in skills if isinstance(skill, str) and skill.strip()
+    })
+
+async def backfill_search_fields():
+    """Add skills_normalized to portfolios written before search existed"""
+    updated = 0
+    cursor = db.db.portfolios.find(
+        {"skills_normalized": {"$exists": False}},
+        {"data.skills": 1}
+    )
+    operations = []
+    async for portfolio in cursor:
+        skills = (portfolio.get("data") or {}).get("skills") or []
+        operations.append(UpdateOne(
+            {"_id": portfolio["_id"]},
+            {"$set": {"skills_normalized": normalize_skills(skills)}}
+        ))
+        if len(operations) >= SEARCH_BACKFILL_BATCH_SIZE:
+            await db.db.portfolios.bulk_write(operations, ordered=False)
+            updated += len(operations)
+            operations = []
+    if operations:
+        await db.db.portfolios.bulk_write(operations, ordered=False)
+        updated += len(operations)
+    if updated:
+        print(f"Backfilled search fields on {updated} portfolios")
+
+class SkillFacets(PeriodicTask):
+    """
+    Top skills across published portfolios, recomputed on an interval instead of per request.
+
+    Only the process running the maintenance tasks computes them and stores
+    the result in search_facets; every other worker reads that document.
+    """
+
+    run_immediately = True
+
+    def __init__(self, refresh_interval: float = SKILL_FACETS_REFRESH_SECONDS,
+                 limit: int = SKILL_FACETS_LIMIT):
+        super().__init__(refresh_interval)
+        self.limit = limit
+        self.compute = False
+        self.skills: List[dict] = []
+        self.refreshed_at: Optional[datetime] = None
+
+    async def refresh(self):
+        """Count skills with one aggregation over the published portfolios and store them"""
+        # The public read model holds only published portfolios
+        pipeline = [
+            {"$unwind": "$skills_normalized"},
+            {"$group": {"_id": "$skills_normalized", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": self.limit},
+        ]
+        try:
+            results = await public_reader().public_portfolios.aggregate(pipeline).to_list(length=self.limit)
+            self.skills = [{"skill": row["_id"], "count": row["count"]} for row in results]
+            self.refreshed_at = datetime.utcnow()
+            await db.db.search_facets.replace_one(
+                {"_id": "skills"},
+                {"skills": self.skills, "refreshed_at": self.refreshed_at},
+                upsert=True
+            )
+        except Exception as e:
+            # Keep serving the previous counts
+            print(f"Failed to refresh skill facets: {e}")
+
+    async def load(self):
+        """Read the counts the maintenance process stored"""
+        try:
+            stored = await db.db.search_facets.find_one({"_id": "skills"})
+            if stored is not None:
+                self.skills = stored["skills"]
+                self.refreshed_at = stored["refreshed_at"]
+        except Exception as e:
+            # Keep serving the previous counts
+            print(f"Failed to load skill facets: {e}")
+
+    async def run_once(self):
+        if self.compute:
+            await self.refresh()
+        else:
+            await self.load()
+
+# Skill facets instance
+skill_facets = SkillFacets()
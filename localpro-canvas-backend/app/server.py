@@ -0,0 +1,193 @@
+"""
+Production entry point: run the API in several worker processes.
+
+    python -m app.server                     # one worker per available core
+    python -m app.server --workers 4 --port 8080
+    python -m app.server --create-indexes-only   # release step, then start with --no-create-indexes
+
+Indexes are created once by this launcher before any worker starts; the
+workers skip them. With more than one worker, the backfills and periodic
+jobs over whole collections run in one extra maintenance process rather
+than in every worker; see app.maintenance. Each worker is a freshly spawned interpreter that opens
+its own Motor client in the app lifespan, so no client, socket or event
+loop is shared across processes. Every worker has its own connection pool
+of up to MONGO_MAX_POOL_SIZE connections.
+
+Caches stay per worker. A write clears its own worker's cache at once and
+the other workers within PUBLIC_CHANGE_POLL_SECONDS, through the
+public_changes feed. /metrics reports only the worker that answers the
+scrape; use one worker per container where that matters.
+
+On SIGTERM or SIGINT the workers stop accepting connections, finish
+in-flight requests for up to SERVER_GRACEFUL_SHUTDOWN_SECONDS, then run
+the lifespan shutdown, which flushes buffered view counts before closing
+the client.
+"""
+import argparse
+import asyncio
+import math
+import multiprocessing
+import os
+import socket
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+from dotenv import load_dotenv
+from .database import Database, db
+from .maintenance import RUN_MAINTENANCE_TASKS, run_maintenance
+
+load_dotenv()
+
+# Launcher configuration; WEB_CONCURRENCY is the usual platform hint for worker count
+SERVER_HOST = os.getenv("HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("PORT", 8000))
+WEB_CONCURRENCY = os.getenv("WEB_CONCURRENCY")
+SERVER_GRACEFUL_SHUTDOWN_SECONDS = float(os.getenv("SERVER_GRACEFUL_SHUTDOWN_SECONDS", 30))
+SERVER_KEEP_ALIVE_SECONDS = int(os.getenv("SERVER_KEEP_ALIVE_SECONDS", 5))
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", 2048))
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+APP = "app.main:app"
+
+def _cgroup_cpu_limit():
+    """CPU quota of the container, if the cgroup sets one"""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1: quota is -1 when unlimited
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+def available_cpus() -> int:
+    """Cores this process may run on, honouring CPU affinity and container quotas"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(cpus, 1)
+
+def default_workers() -> int:
+    """WEB_CONCURRENCY if set, otherwise one worker per available core"""
+    if WEB_CONCURRENCY:
+        return max(int(WEB_CONCURRENCY), 1)
+    return available_cpus()
+
+async def create_indexes() -> bool:
+    """Create the indexes once for the whole deployment; returns whether it worked"""
+    create_on_connect = Database.create_indexes_on_connect
+    Database.create_indexes_on_connect = False
+    try:
+        await db.connect_to_mongo()
+        await db.create_indexes()
+        return True
+    except Exception as e:
+        print(f"Failed to create indexes: {e}")
+        return False
+    finally:
+        await db.close_mongo_connection()
+        Database.create_indexes_on_connect = create_on_connect
+
+def start_maintenance_process() -> multiprocessing.Process:
+    """Run the maintenance tasks in their own process, and keep them out of the workers"""
+    # Spawned workers read this on import
+    os.environ["RUN_MAINTENANCE_TASKS"] = "false"
+    process = multiprocessing.get_context("spawn").Process(target=run_maintenance, name="maintenance")
+    process.start()
+    return process
+
+def stop_maintenance_process(process: multiprocessing.Process):
+    process.terminate()
+    process.join(SERVER_GRACEFUL_SHUTDOWN_SECONDS)
+    if process.is_alive():
+        process.kill()
+
+def serve(app: str = APP, host: str = SERVER_HOST, port: int = SERVER_PORT,
+          workers: int = None, create_indexes_first: bool = True, maintenance: bool = True):
+    """
+    Create indexes, then run the app in worker processes until a shutdown signal.
+
+    maintenance=False leaves the maintenance tasks to each worker's lifespan,
+    as RUN_MAINTENANCE_TASKS decides there.
+    """
+    workers = workers or default_workers()
+
+    if create_indexes_first and not asyncio.run(create_indexes()):
+        # Leave index creation to the workers rather than start without indexes
+        print("Workers will create indexes on startup")
+    else:
+        # Spawned workers read this on import; a single in-process worker reads the class attribute
+        os.environ["MONGO_CREATE_INDEXES"] = "false"
+        Database.create_indexes_on_connect = False
+
+    config = uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        workers=workers,
+        backlog=SERVER_BACKLOG,
+        timeout_keep_alive=SERVER_KEEP_ALIVE_SECONDS,
+        timeout_graceful_shutdown=SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+        lifespan="on",
+    )
+    print(f"Starting {workers} worker(s) on {host}:{port}")
+    if workers == 1:
+        uvicorn.Server(config).run()
+        return
+    
+    # The shared listening socket is bound here with an explicit TCP protocol.
+    # asyncio only sets TCP_NODELAY on accepted sockets whose proto is
+    # IPPROTO_TCP, and uvicorn binds with proto 0, which leaves Nagle's
+    # algorithm on and adds ~40 ms to every response written in two parts.
+    bound = config.bind_socket()
+    sock = socket.socket(bound.family, bound.type, socket.IPPROTO_TCP, bound.detach())
+    maintenance_process = None
+    if maintenance and RUN_MAINTENANCE_TASKS:
+        maintenance_process = start_maintenance_process()
+    try:
+        Multiprocess(config, sockets=[sock]).run()
+    finally:
+        if maintenance_process is not None:
+            stop_maintenance_process(maintenance_process)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: WEB_CONCURRENCY or one per available core)")
+    indexes = parser.add_mutually_exclusive_group()
+    indexes.add_argument("--no-create-indexes", action="store_true",
+                         help="skip index creation, e.g. when a release step already ran it")
+    indexes.add_argument("--create-indexes-only", action="store_true",
+                         help="create indexes and exit")
+    args = parser.parse_args()
+
+    if args.create_indexes_only:
+        raise SystemExit(0 if asyncio.run(create_indexes()) else 1)
+
+    serve(
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        create_indexes_first=not args.no_create_indexes
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from datetime import datetime
+from html import escape
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import quote
+from dotenv import load_dotenv
+from .database import db
+
+load_dotenv()
+
+# Snapshot configuration
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", "snapshots"))
+# Shared caches may serve a snapshot for max-age after it is unpublished or deleted,
+# then revalidate it by ETag. Nothing purges CDN copies, so a longer max-age or
+# stale-while-revalidate needs a purge on unpublish and delete set up alongside it
+SNAPSHOT_CACHE_CONTROL = os.getenv("SNAPSHOT_CACHE_CONTROL", "public, max-age=60")
+# Renders attempted before a refresh leaves a busy portfolio to the refresh of its next write
+SNAPSHOT_REFRESH_ATTEMPTS = 3
+
+TEMPLATES = ("modern", "old-aesthetic")
+
+_STYLES = {
+    "modern": """
+body{margin:0;font-family:system-ui,-apple-system,"Segoe UI",Roboto,sans-serif;color:#111827;background:#fff}
+header{position:sticky;top:0;background:rgba(255,255,255,.95);border-bottom:1px solid #e5e7eb}
+header .wrap{display:flex;justify-content:space-between;align-items:center}
+header h1{font-size:1.25rem;margin:0}
+nav a{margin-left:1.5rem;color:#4b5563;text-decoration:none}
+.wrap{max-width:72rem;margin:0 auto;padding:1rem 1.5rem}
+#home{background:linear-gradient(135deg,#fff,#eff6ff,#fff);padding:6rem 0}
+#home h2{font-size:3.5rem;margin:0 0 1rem}
+#home h2 span{color:#2563eb}
+.lead{font-size:1.25rem;color:#4b5563}
+section{padding:4rem 0}
+h3{font-size:1.75rem}
+.tags{display:flex;flex-wrap:wrap;gap:.5rem;padding:0;list-style:none}
+.tags li{background:#eff6ff;color:#1d4ed8;border-radius:9999px;padding:.4rem 1rem}
+#contact{background:#f9fafb}
+a{color:#2563eb}
+footer{background:#111827;color:#d1d5db;text-align:center;padding:2rem 0}
+""",
+    "old-aesthetic": """
+body{margin:0;font-family:Georgia,"Times New Roman",serif;color:#3e2723;background:#fdf8f0}
+header{border-bottom:2px solid #c9a96e}
+header .wrap{display:flex;justify-content:space-between;align-items:center}
+header h1{font-size:1.5rem;margin:0;letter-spacing:.05em}
+nav a{margin-left:1.5rem;color:#5d4037;text-decoration:none;font-style:italic}
+.wrap{max-width:64rem;margin:0 auto;padding:1rem 1.5rem}
+#home{padding:6rem 0;border-left:2px solid #c9a96e;margin-left:2rem;padding-left:2rem}
+#home h2{font-size:3.25rem;margin:0 0 1rem;font-weight:normal}
+.lead{font-size:1.25rem;font-style:italic;color:#5d4037}
+section{padding:4rem 0}
+h3{font-size:1.75rem;font-weight:normal;border-bottom:1px solid #c9a96e;padding-bottom:.5rem}
+.tags{display:flex;flex-wrap:wrap;gap:.75rem;padding:0;list-style:none}
+.tags li{border:1px solid #c9a96e;padding:.4rem 1rem}
+a{color:#8d6e63}
+footer{background:#3e2723;color:#c9a96e;text-align:center;padding:2rem 0}
+""",
+}
+
+def render_snapshot(template: str, portfolio: dict) -> str:
+    """Render a published portfolio as a static HTML page in one of the templates"""
+    data = portfolio["data"]
+    name = escape(data["name"])
+    about = data.get("about", "")
+    lead = escape(about.split(".")[0] + ".") if about else ""
+    contact = data.get("contactDetails", {})
+    email = escape(contact.get("email", ""))
+    mobile = escape(contact.get("mobile", ""))
+    skills = "".join(f"<li>{escape(skill)}</li>" for skill in data.get("skills", []))
+    top_skills = "".join(f"<li>{escape(skill)}</li>" for skill in data.get("skills", [])[:4])
+    hobbies = "".join(f"<li>{escape(hobby)}</li>" for hobby in data.get("hobbies", []))
+    first_name = escape(data["name"].split(" ")[0]) if data["name"] else ""
+    year = datetime.utcnow().year
+
+    return f"""<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{name}</title>
+<meta name="description" content="{escape(about[:160])}">
+<meta property="og:title" content="{name}">
+<meta property="og:description" content="{escape(about[:160])}">
+<style>{_STYLES[template]}</style>
+</head>
+<body class="template-{template}">
+<header><div class="wrap"><h1>{name}</h1>
+<nav><a href="#home">Home</a><a href="#about">About</a><a href="#contact">Contact</a></nav></div></header>
+<main>
+<section id="home"><div class="wrap">
+<h2><span>{name}</span></h2>
+<p class="lead">{lead}</p>
+<ul class="tags">{top_skills}</ul>
+</div></section>
+<section id="about"><div class="wrap">
+<h3>About {first_name}</h3>
+<p>{escape(about)}</p>
+<h3>Skills</h3>
+<ul class="tags">{skills}</ul>
+<h3>Hobbies</h3>
+<ul class="tags">{hobbies}</ul>
+</div></section>
+<section id="contact"><div class="wrap">
+<h3>Contact</h3>
+<p><a href="mailto:{email}">{email}</a></p>
+<p><a href="tel:{mobile}">{mobile}</a></p>
+</div></section>
+</main>
+<footer>&copy; {year} {name}. All rights reserved.</footer>
+</body>
+</html>
+"""
+
+def snapshot_path(template: str, unique_identifier: str) -> Path:
+    """Disk location of a snapshot; the identifier is quoted so it cannot escape the directory"""
+    return SNAPSHOT_DIR / template / f"{quote(unique_identifier, safe='')}.html"
+
+def snapshot_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def _write_snapshots(portfolio: dict):
+    written = []
+    try:
+        for template in TEMPLATES:
+            path = snapshot_path(template, portfolio["unique_identifier"])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write a uniquely named file then rename it, so readers never see a
+            # partial file and concurrent refreshes never share a temp file
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=path.parent, suffix=".tmp", delete=False
+            ) as f:
+                written.append((f.name, path))
+                f.write(render_snapshot(template, portfolio))
+        for tmp_name, path in written:
+            os.replace(tmp_name, path)
+    except Exception:
+        for tmp_name, _ in written:
+            try:
+                os.unlink(tmp_name)
+            except FileNotFoundError:
+                pass
+        raise
+
+def _remove_snapshots(unique_identifier: str):
+    for template in TEMPLATES:
+        try:
+            snapshot_path(template, unique_identifier).unlink()
+        except FileNotFoundError:
+            pass
+
+def _read_snapshot(template: str, unique_identifier: str) -> Optional[bytes]:
+    try:
+        return snapshot_path(template, unique_identifier).read_bytes()
+    except FileNotFoundError:
+        return None
+
+# Refreshes of one portfolio run one at a time in this process: [lock, users]
+_refresh_locks: Dict[str, List] = {}
+
+async def _current_portfolio(unique_identifier: str) -> Optional[dict]:
+    return await db.db.portfolios.find_one(
+        {"unique_identifier": unique_identifier},
+        {"unique_identifier": 1, "data": 1, "is_published": 1, "revision": 1}
+    )
+
+def _snapshot_state(portfolio: Optional[dict]):
+    if portfolio is None or not portfolio.get("is_published"):
+        return None
+    # The revision moves on with every write to the portfolio
+    return ("published", portfolio.get("revision"))
+
+async def _refresh(unique_identifier: str):
+    """
+    Bring the snapshots on disk in line with the portfolio on the primary.
+
+    The portfolio is read again after the files are written or removed; if
+    it changed in between, the refresh starts over, so a late render of a
+    published version cannot outlive an unpublish or delete, even one
+    handled by another worker.
+    """
+    for _ in range(SNAPSHOT_REFRESH_ATTEMPTS):
+        portfolio = await _current_portfolio(unique_identifier)
+        state = _snapshot_state(portfolio)
+        if state is None:
+            await asyncio.to_thread(_remove_snapshots, unique_identifier)
+        else:
+            await asyncio.to_thread(_write_snapshots, portfolio)
+        if _snapshot_state(await _current_portfolio(unique_identifier)) == state:
+            return
+    print(f"Snapshots for {unique_identifier} kept changing; left to the next refresh")
+
+async def _serialized_refresh(unique_identifier: str):
+    entry = _refresh_locks.setdefault(unique_identifier, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            await _refresh(unique_identifier)
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _refresh_locks[unique_identifier]
+
+async def refresh_snapshots(portfolio: dict):
+    """Re-render both templates for a published portfolio, or drop them once unpublished"""
+    try:
+        await _serialized_refresh(portfolio["unique_identifier"])
+    except Exception as e:
+        print(f"Failed to refresh snapshots for {portfolio['unique_identifier']}: {e}")
+
+async def remove_snapshots(unique_identifier: str):
+    """Drop the snapshots of a deleted portfolio"""
+    try:
+        await _serialized_refresh(unique_identifier)
+    except Exception as e:
+        print(f"Failed to remove snapshots for {unique_identifier}: {e}")
+
+async def read_snapshot(template: str, unique_identifier: str) -> Optional[bytes]:
+    """Read a stored snapshot, or None when it has not been generated"""
+    return await asyncio.to_thread(_read_snapshot, template, unique_identifier)
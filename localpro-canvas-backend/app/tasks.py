@@ -0,0 +1,46 @@
+import asyncio
+from typing import Optional
+
+class PeriodicTask:
+    """
+    Background job run on a fixed interval, started and stopped by the app lifespan.
+
+    Subclasses implement run_once, and optionally setup for one-off work
+    before the first run. By default the first run waits one interval;
+    set run_immediately to run right after setup instead.
+    """
+
+    run_immediately = False
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def setup(self):
+        """One-off work before the first run"""
+
+    async def run_once(self):
+        raise NotImplementedError
+
+    async def _run(self):
+        await self.setup()
+        if not self.run_immediately:
+            await asyncio.sleep(self.interval)
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+        """Start the periodic task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the periodic task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,110 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+from .analytics import hour_start, hourly_increments
+from .database import db
+from .tasks import PeriodicTask
+
+load_dotenv()
+
+# View counter configuration
+VIEW_FLUSH_INTERVAL_SECONDS = float(os.getenv("VIEW_FLUSH_INTERVAL_SECONDS", 5))
+VIEW_FLUSH_MAX_PENDING = int(os.getenv("VIEW_FLUSH_MAX_PENDING", 1000))
+
+class ViewCounter(PeriodicTask):
+    """Buffer portfolio view increments in memory and flush them in batches"""
+
+    def __init__(self, flush_interval: float = VIEW_FLUSH_INTERVAL_SECONDS,
+                 max_pending: int = VIEW_FLUSH_MAX_PENDING):
+        super().__init__(flush_interval)
+        self.max_pending = max_pending
+        # Increments by unique_identifier not yet sent to MongoDB
+        self._pending: Dict[str, int] = {}
+        # Increments sent by the running flush but not yet acknowledged
+        self._in_flight: Dict[str, int] = {}
+        # Increments by (unique_identifier, hour) for the hourly analytics buckets
+        self._pending_hours: Dict[Tuple[str, datetime], int] = {}
+        self._pending_total = 0
+        self._flush_lock = asyncio.Lock()
+        self._threshold_flush: Optional[asyncio.Task] = None
+
+    def increment(self, unique_identifier: str, amount: int = 1) -> int:
+        """Record views and return the unflushed count for the portfolio"""
+        self._pending[unique_identifier] = self._pending.get(unique_identifier, 0) + amount
+        self._pending_total += amount
+        bucket = (unique_identifier, hour_start(datetime.utcnow()))
+        self._pending_hours[bucket] = self._pending_hours.get(bucket, 0) + amount
+
+        # Flush early once the buffer is full
+        if self._pending_total >= self.max_pending and self._task is not None:
+            if self._threshold_flush is None or self._threshold_flush.done():
+                self._threshold_flush = asyncio.create_task(self.flush())
+
+        return self.unflushed(unique_identifier)
+
+    def unflushed(self, unique_identifier: str) -> int:
+        """Views counted for a portfolio that are not yet stored in MongoDB"""
+        return self._pending.get(unique_identifier, 0) + self._in_flight.get(unique_identifier, 0)
+
+    async def flush(self):
+        """Write all buffered increments with one bulk_write per collection"""
+        async with self._flush_lock:
+            if not self._pending and not self._pending_hours:
+                return
+
+            self._in_flight = self._pending
+            self._pending = {}
+            self._pending_total = 0
+            hours, self._pending_hours = self._pending_hours, {}
+
+            if self._in_flight:
+                operations = [
+                    UpdateOne({"unique_identifier": unique_identifier}, {"$inc": {"views": count}})
+                    for unique_identifier, count in self._in_flight.items()
+                ]
+                try:
+                    await db.db.portfolios.bulk_write(operations, ordered=False)
+                except Exception as e:
+                    # Keep the counts so the next flush retries them
+                    for unique_identifier, count in self._in_flight.items():
+                        self._pending[unique_identifier] = self._pending.get(unique_identifier, 0) + count
+                        self._pending_total += count
+                    print(f"Failed to flush view counts: {e}")
+                else:
+                    # The public read model carries its own copy; a missed write there stays
+                    # behind portfolios.views until the portfolio is next published
+                    try:
+                        await db.db.public_portfolios.bulk_write([
+                            UpdateOne({"_id": unique_identifier}, {"$inc": {"views": count}})
+                            for unique_identifier, count in self._in_flight.items()
+                        ], ordered=False)
+                    except Exception as e:
+                        print(f"Failed to flush public view counts: {e}")
+                finally:
+                    self._in_flight = {}
+
+            if hours:
+                try:
+                    await db.db.portfolio_view_buckets.bulk_write(hourly_increments(hours), ordered=False)
+                except Exception as e:
+                    # Keep the counts so the next flush retries them
+                    for bucket, count in hours.items():
+                        self._pending_hours[bucket] = self._pending_hours.get(bucket, 0) + count
+                    print(f"Failed to flush hourly view buckets: {e}")
+
+    async def run_once(self):
+        await self.flush()
+
+    async def stop(self):
+        """Stop the periodic flush task and flush remaining views"""
+        await super().stop()
+        if self._threshold_flush is not None:
+            await asyncio.gather(self._threshold_flush, return_exceptions=True)
+            self._threshold_flush = None
+        await self.flush()
+
+# View counter instance
+view_counter = ViewCounter()
@@ -0,0 +1,175 @@
+"""
+Endpoint load test: throughput and p50/p95/p99 latency per route.
+
+Run from localpro-canvas-backend:
+
+    python -m benchmarks.endpoints --mongo mock                 # in-memory stand-in
+    python -m benchmarks.endpoints --mongo url                  # MONGODB_URL / DATABASE_NAME
+    python -m benchmarks.endpoints --output after.json --compare before.json
+
+Results are written as JSON so runs can be compared. With a real MongoDB the
+report also shows MongoDB commands per request, which guards against
+round-trip regressions; the in-memory stand-in does not emit command events.
+tests/test_command_counts.py enforces per-request command budgets without a
+server.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import time
+import uuid
+
+from app.metrics import mongo_commands
+from benchmarks.harness import (
+    PASSWORD, create_published_portfolio, create_user, portfolio_payload,
+    run_workers, running_app, summarize
+)
+
+SCENARIOS = [
+    "register", "login", "create_portfolio", "list_portfolios", "get_portfolio",
+    "update_portfolio", "public_portfolio", "public_batch", "search_portfolios",
+    "delete_portfolio",
+]
+BATCH_SIZE = 20
+
+def scenario_requests(client, context):
+    """Map scenario names to request(i) callables"""
+    email, headers = context["email"], context["headers"]
+    published, created = context["published"], context["created"]
+
+    async def register(i):
+        return await client.post("/register", json={
+            "email": f"bench-{uuid.uuid4().hex[:12]}@example.com", "password": PASSWORD
+        })
+
+    async def login(i):
+        return await client.post("/login", json={"email": email, "password": PASSWORD})
+
+    async def create_portfolio(i):
+        response = await client.post("/portfolios", headers=headers, json=portfolio_payload(email, f"Bench {i}"))
+        if response.status_code == 200:
+            created.append(response.json()["data"]["unique_identifier"])
+        return response
+
+    async def list_portfolios(i):
+        return await client.get("/portfolios", headers=headers)
+
+    async def get_portfolio(i):
+        return await client.get(f"/portfolios/{published}", headers=headers)
+
+    async def update_portfolio(i):
+        payload = portfolio_payload(email, f"Updated {i}")
+        return await client.put(f"/portfolios/{published}", headers=headers, json={"data": payload["data"]})
+
+    async def public_portfolio(i):
+        return await client.get(f"/p/{published}")
+
+    async def public_batch(i):
+        return await client.post("/p/batch", json={"identifiers": context["batch"]})
+
+    async def search_portfolios(i):
+        return await client.get("/search/portfolios", params={"skills": "python,mongodb", "limit": 20})
+
+    async def delete_portfolio(i):
+        return await client.delete(f"/portfolios/{created[i % len(created)]}", headers=headers)
+
+    return {
+        "register": register,
+        "login": login,
+        "create_portfolio": create_portfolio,
+        "list_portfolios": list_portfolios,
+        "get_portfolio": get_portfolio,
+        "update_portfolio": update_portfolio,
+        "public_portfolio": public_portfolio,
+        "public_batch": public_batch,
+        "search_portfolios": search_portfolios,
+        "delete_portfolio": delete_portfolio,
+    }
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_report(results, baseline=None):
+    print(f"{'scenario':<18} {'reqs':>6} {'err':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'cmds/req':>9}")
+    for name, result in results.items():
+        line = (
+            f"{name:<18} {result['requests']:>6} {result['errors']:>5} {result['throughput_rps']:>9.1f} "
+            f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+            f"{result['mongo_commands_per_request']:>9.2f}"
+        )
+        previous = (baseline or {}).get(name)
+        if previous and previous["p99_ms"]:
+            change = (result["p99_ms"] - previous["p99_ms"]) / previous["p99_ms"] * 100
+            line += f"   p99 {change:+.1f}% vs baseline"
+        print(line)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo", choices=["mock", "url"], default="mock")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset to run")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file from an earlier run")
+    args = parser.parse_args()
+
+    selected = [name for name in args.scenarios.split(",") if name]
+    unknown = set(selected) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if "delete_portfolio" in selected and "create_portfolio" not in selected:
+        parser.error("delete_portfolio deletes what create_portfolio made; run both")
+
+    results = {}
+    async with running_app(args.mongo) as client:
+        email, headers = await create_user(client)
+        context = {
+            "email": email,
+            "headers": headers,
+            "published": await create_published_portfolio(client, email, headers),
+            "created": [],
+            "batch": [],
+        }
+        if "public_batch" in selected:
+            context["batch"] = [
+                await create_published_portfolio(client, email, headers, f"Batch {i}")
+                for i in range(BATCH_SIZE)
+            ]
+        requests = scenario_requests(client, context)
+
+        for name in SCENARIOS:
+            if name not in selected:
+                continue
+            commands_before = mongo_commands.total()
+            latencies, errors, elapsed = await run_workers(args.concurrency, args.requests, requests[name])
+            results[name] = summarize(latencies, errors, elapsed)
+            results[name]["mongo_commands_per_request"] = round(
+                (mongo_commands.total() - commands_before) / max(len(latencies), 1), 2
+            )
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "git_revision": git_revision(),
+                "python": platform.python_version(),
+                "mongo": args.mongo,
+                "concurrency": args.concurrency,
+                "requests_per_scenario": args.requests,
+                "results": results,
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
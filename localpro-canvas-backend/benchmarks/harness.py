@@ -0,0 +1,138 @@
+"""
+Shared helpers for driving the FastAPI app in-process during benchmarks.
+"""
+import asyncio
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+import httpx
+
+from app.database import Database
+from app.main import app
+
+PASSWORD = "Benchmark123"
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def summarize(latencies, errors, elapsed):
+    """Throughput and latency percentiles (ms) for one scenario"""
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+def _accept_bulk_sort():
+    """
+    Let mongomock take the sort argument pymongo 4.10+ passes for UpdateOne and ReplaceOne.
+
+    mongomock 4.3, the latest release, predates it, so every bulk_write of
+    those operations failed, including each view count flush. The app never
+    sets a sort, so an unset one is dropped and a set one still fails.
+    """
+    from mongomock.collection import BulkOperationBuilder
+
+    for name in ("add_update", "add_replace"):
+        method = getattr(BulkOperationBuilder, name)
+        if getattr(method, "accepts_sort", False):
+            continue
+
+        def without_sort(self, *args, _method=method, sort=None, **kwargs):
+            if sort is not None:
+                raise NotImplementedError("mongomock cannot sort bulk writes")
+            return _method(self, *args, **kwargs)
+        without_sort.accepts_sort = True
+        setattr(BulkOperationBuilder, name, without_sort)
+
+@asynccontextmanager
+async def running_app(mongo: str = "url"):
+    """
+    Run the app lifespan and yield an httpx client bound to it.
+
+    mongo="url" connects to MONGODB_URL/DATABASE_NAME as the app normally does.
+    mongo="mock" installs an in-memory mongomock-motor client instead; it is
+    good for comparing CPU cost between runs, not for absolute numbers.
+    Commands it cannot emulate raise errors a server would not, and the app
+    logs them like any other database failure; check the output for them.
+    """
+    if mongo == "mock":
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("--mongo mock needs mongomock-motor: pip install -r benchmarks/requirements.txt")
+        _accept_bulk_sort()
+        # Database keeps its client on the class; connect_to_mongo then leaves it in place
+        Database.client = AsyncMongoMockClient()
+        Database.db = Database.client[os.getenv("DATABASE_NAME") or "benchmark"]
+        Database.public_db = Database.db
+        await Database.create_indexes()
+
+    # ASGITransport does not run lifespan events, so drive them here
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            yield client
+
+async def create_user(client):
+    """Register and log in a fresh user, returning (email, auth headers)"""
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    await client.post("/register", json={"email": email, "password": PASSWORD})
+    response = await client.post("/login", json={"email": email, "password": PASSWORD})
+    return email, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def portfolio_payload(email, name="Benchmark User"):
+    return {
+        "template": "modern",
+        "data": {
+            "name": name,
+            "skills": ["Python", "MongoDB", "FastAPI"],
+            "hobbies": ["Running", "Chess"],
+            "about": "Portfolio created by the benchmark harness",
+            "contactDetails": {"email": email, "mobile": "+1 555 0100"},
+            "template_selected": "modern",
+        },
+    }
+
+async def create_published_portfolio(client, email, headers, name="Benchmark User"):
+    """Create a portfolio, publish it and return its unique identifier"""
+    response = await client.post("/portfolios", headers=headers, json=portfolio_payload(email, name))
+    unique_identifier = response.json()["data"]["unique_identifier"]
+    await client.put(f"/portfolios/{unique_identifier}", headers=headers, json={"is_published": True})
+    return unique_identifier
+
+async def run_workers(concurrency, total, request):
+    """
+    Issue `total` calls of request(i) from `concurrency` workers.
+
+    Returns (latencies_ms, errors, elapsed_s).
+    """
+    latencies, errors = [], 0
+    next_index = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in next_index:
+            started = time.perf_counter()
+            # Yield first so time spent waiting for a blocked event loop is counted;
+            # in-memory stand-ins may otherwise never suspend
+            await asyncio.sleep(0)
+            response = await request(i)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
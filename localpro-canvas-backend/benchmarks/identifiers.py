@@ -0,0 +1,122 @@
+"""
+Concurrency stress test for the portfolio identifier allocator.
+
+Run from localpro-canvas-backend:
+
+    python -m benchmarks.identifiers --mongo mock
+    python -m benchmarks.identifiers --mongo url --processes 8 --allocators 4 --tasks 32
+
+Every allocator stands in for one app worker with its own counter blocks;
+--processes runs that many OS processes against MONGODB_URL. All
+identifiers are allocated for the same portfolio name, the case that
+collided with the old hash-of-timestamp scheme, and a small block size
+forces frequent concurrent leases. The run fails if any identifier is
+handed out twice. It uses its own counter document and removes it at the end.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+
+from app.database import Database, db
+from app.identifiers import IdentifierAllocator
+
+NAME = "Jane Doe"
+
+async def connect(mongo: str):
+    if mongo == "mock":
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("--mongo mock needs mongomock-motor: pip install -r benchmarks/requirements.txt")
+        Database.client = AsyncMongoMockClient()
+        Database.db = Database.client[os.getenv("DATABASE_NAME") or "benchmark"]
+    else:
+        await db.connect_to_mongo()
+
+async def allocate_all(allocators: int, tasks: int, per_task: int, block_size: int, counter_id: str):
+    """Allocate from several allocators, each shared by several tasks; returns (ids, leases)"""
+    instances = [IdentifierAllocator(block_size, counter_id) for _ in range(allocators)]
+    leases = 0
+    for allocator in instances:
+        lease = allocator._lease
+
+        async def counted_lease(lease=lease):
+            nonlocal leases
+            leases += 1
+            await lease()
+        allocator._lease = counted_lease
+
+    async def task(allocator):
+        identifiers = []
+        for _ in range(per_task):
+            identifiers.append(await allocator.allocate(NAME))
+            # Interleave with the other tasks between allocations
+            await asyncio.sleep(0)
+        return identifiers
+
+    results = await asyncio.gather(*(
+        task(allocator) for allocator in instances for _ in range(tasks)
+    ))
+    return [identifier for identifiers in results for identifier in identifiers], leases
+
+def run_process(args):
+    mongo, allocators, tasks, per_task, block_size, counter_id = args
+
+    async def main():
+        await connect(mongo)
+        try:
+            return await allocate_all(allocators, tasks, per_task, block_size, counter_id)
+        finally:
+            await db.close_mongo_connection()
+    return asyncio.run(main())
+
+async def cleanup(mongo: str, counter_id: str):
+    await connect(mongo)
+    await db.db.counters.delete_one({"_id": counter_id})
+    await db.close_mongo_connection()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo", choices=["mock", "url"], default="mock")
+    parser.add_argument("--processes", type=int, default=1, help="OS processes (url only)")
+    parser.add_argument("--allocators", type=int, default=8, help="allocators (app workers) per process")
+    parser.add_argument("--tasks", type=int, default=16, help="concurrent creates per allocator")
+    parser.add_argument("--per-task", type=int, default=200, help="identifiers allocated by each task")
+    parser.add_argument("--block-size", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.mongo == "mock" and args.processes != 1:
+        parser.error("the in-memory stand-in cannot be shared between processes; use --mongo url")
+
+    counter_id = f"stress-{uuid.uuid4().hex}"
+    job = (args.mongo, args.allocators, args.tasks, args.per_task, args.block_size, counter_id)
+
+    started = time.perf_counter()
+    if args.processes == 1:
+        results = [run_process(job)]
+    else:
+        with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+            results = pool.map(run_process, [job] * args.processes)
+    elapsed = time.perf_counter() - started
+
+    identifiers = [identifier for ids, _ in results for identifier in ids]
+    leases = sum(count for _, count in results)
+    duplicates = len(identifiers) - len(set(identifiers))
+
+    if args.mongo == "url":
+        asyncio.run(cleanup(args.mongo, counter_id))
+
+    print(f"identifiers  {len(identifiers)}")
+    print(f"processes    {args.processes} x {args.allocators} allocators x {args.tasks} tasks")
+    print(f"leases       {leases} (block size {args.block_size})")
+    print(f"throughput   {len(identifiers) / elapsed:.0f} ids/s")
+    print(f"duplicates   {duplicates}")
+    if duplicates:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
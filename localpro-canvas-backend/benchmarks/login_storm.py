@@ -0,0 +1,74 @@
+"""
+Measure GET /p/{unique_identifier} latency while a login storm is running.
+
+Run from localpro-canvas-backend:
+
+    PASSWORD_EXECUTOR=inline python -m benchmarks.login_storm   # before: bcrypt on the event loop
+    PASSWORD_EXECUTOR=thread python -m benchmarks.login_storm   # after: bcrypt in a thread pool
+
+Pass --mongo mock to use the in-memory stand-in instead of MONGODB_URL.
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.harness import (
+    PASSWORD, create_published_portfolio, create_user, percentile, running_app
+)
+
+async def read_loop(client, unique_identifier, deadline, latencies):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        # Yield first so time spent waiting for a blocked event loop is counted;
+        # in-memory stand-ins may otherwise never suspend
+        await asyncio.sleep(0)
+        await client.get(f"/p/{unique_identifier}")
+        latencies.append((time.perf_counter() - started) * 1000)
+
+async def login_loop(client, email, deadline, statuses):
+    while time.perf_counter() < deadline:
+        response = await client.post("/login", json={"email": email, "password": PASSWORD})
+        statuses.append(response.status_code)
+        await asyncio.sleep(0)
+
+async def run_phase(client, email, unique_identifier, readers, logins, duration):
+    deadline = time.perf_counter() + duration
+    latencies, statuses = [], []
+    await asyncio.gather(
+        *(read_loop(client, unique_identifier, deadline, latencies) for _ in range(readers)),
+        *(login_loop(client, email, deadline, statuses) for _ in range(logins)),
+    )
+    return latencies, statuses
+
+def report(label, latencies, statuses, duration):
+    print(
+        f"{label:<14} reads={len(latencies):<6} "
+        f"p50={percentile(latencies, 50):7.2f}ms "
+        f"p95={percentile(latencies, 95):7.2f}ms "
+        f"p99={percentile(latencies, 99):7.2f}ms "
+        f"logins/s={sum(1 for s in statuses if s == 200) / duration:6.1f} "
+        f"rejected={sum(1 for s in statuses if s == 503)}"
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo", choices=["mock", "url"], default="url")
+    parser.add_argument("--readers", type=int, default=8, help="concurrent /p/ readers")
+    parser.add_argument("--logins", type=int, default=32, help="concurrent login workers")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per phase")
+    args = parser.parse_args()
+
+    async with running_app(args.mongo) as client:
+        email, headers = await create_user(client)
+        unique_identifier = await create_published_portfolio(client, email, headers)
+
+        latencies, statuses = await run_phase(client, email, unique_identifier, args.readers, 0, args.duration)
+        report("idle", latencies, statuses, args.duration)
+
+        latencies, statuses = await run_phase(
+            client, email, unique_identifier, args.readers, args.logins, args.duration
+        )
+        report("login storm", latencies, statuses, args.duration)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,160 @@
+"""
+Micro-benchmarks for per-request CPU hot spots, checked against a stored baseline.
+
+Run from localpro-canvas-backend:
+
+    python -m benchmarks.micro                       # compare with benchmarks/baseline_micro.json
+    python -m benchmarks.micro --update-baseline     # record a new baseline on this machine
+    python -m benchmarks.micro --threshold 0.25      # override every stored threshold
+
+Each benchmark reports the best per-call time over several repeats. The
+baseline file stores, per benchmark, the time per call and the allowed
+slowdown as a fraction; the run exits non-zero when any benchmark exceeds
+its threshold. Baselines are machine specific; record them on the machine
+that runs the check.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+from bson import ObjectId
+
+os.environ.setdefault("SECRET_KEY", "micro-benchmark-secret")
+
+from app.auth import ALGORITHM, SECRET_KEY, create_access_token  # noqa: E402
+from app.compression import PrecompressedJSON  # noqa: E402
+from app.identifiers import format_identifier  # noqa: E402
+from app.main import _normalize_portfolio_doc  # noqa: E402
+from app.models import ContactDetails, PortfolioData  # noqa: E402
+from app.schemas import PortfolioResponse, UserCreate  # noqa: E402
+from jose import jwt  # noqa: E402
+
+BASELINE_PATH = Path(__file__).with_name("baseline_micro.json")
+DEFAULT_THRESHOLD = 0.30
+
+PORTFOLIO_DATA = {
+    "name": "Jane Doe",
+    "skills": ["Python", "MongoDB", "FastAPI", "React", "Docker"],
+    "hobbies": ["Running", "Chess", "Photography"],
+    "about": "Full-stack developer building portfolio tooling for local professionals. " * 4,
+    "contactDetails": {"email": "jane@example.com", "mobile": "+1 555 0100"},
+    "template_selected": "modern",
+}
+
+PORTFOLIO_DOC = {
+    "_id": ObjectId(),
+    "unique_identifier": "jane-doe-1a2b3c4d",
+    "user_id": ObjectId(),
+    "template": "modern",
+    "data": PortfolioData(**PORTFOLIO_DATA).dict(),
+    "is_published": True,
+    "views": 42,
+    "created_at": datetime.utcnow(),
+    "updated_at": datetime.utcnow(),
+}
+
+PUBLIC_BODY = PrecompressedJSON({
+    key: PORTFOLIO_DOC[key]
+    for key in ("unique_identifier", "template", "data", "is_published", "created_at", "views")
+}, "views")
+
+TOKEN = create_access_token({"sub": "jane@example.com", "user_id": str(ObjectId())})
+
+def bench_contact_details():
+    ContactDetails(**PORTFOLIO_DATA["contactDetails"])
+
+def bench_portfolio_data():
+    PortfolioData(**PORTFOLIO_DATA)
+
+def bench_validate_password():
+    UserCreate(email="jane@example.com", password="CorrectHorse9Battery")
+
+def bench_portfolio_response():
+    PortfolioResponse(**_normalize_portfolio_doc(PORTFOLIO_DOC))
+
+def bench_create_access_token():
+    create_access_token({"sub": "jane@example.com", "user_id": "64b7f0c2a1b2c3d4e5f60718"})
+
+def bench_decode_access_token():
+    jwt.decode(TOKEN, SECRET_KEY, algorithms=[ALGORITHM])
+
+def bench_format_identifier():
+    format_identifier("Jane Doe", 123456789)
+
+def bench_public_body_gzip():
+    PUBLIC_BODY.render(43, "gzip")
+
+def bench_public_body_br():
+    PUBLIC_BODY.render(43, "br")
+
+BENCHMARKS = {
+    "ContactDetails": bench_contact_details,
+    "PortfolioData": bench_portfolio_data,
+    "UserCreate.validate_password": bench_validate_password,
+    "normalize+PortfolioResponse": bench_portfolio_response,
+    "create_access_token": bench_create_access_token,
+    "jwt.decode": bench_decode_access_token,
+    "format_identifier": bench_format_identifier,
+    "public body gzip": bench_public_body_gzip,
+    "public body br": bench_public_body_br,
+}
+
+def measure(fn, repeat):
+    """Best per-call time in microseconds"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--threshold", type=float, help="allowed slowdown as a fraction, for every benchmark")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {name: measure(fn, args.repeat) for name, fn in BENCHMARKS.items()}
+
+    if args.update_baseline:
+        # Keep thresholds that were tuned by hand
+        baseline = {
+            name: {
+                "us_per_call": round(us, 3),
+                "threshold": baseline.get(name, {}).get("threshold", DEFAULT_THRESHOLD),
+            }
+            for name, us in results.items()
+        }
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+
+    regressions = []
+    print(f"{'benchmark':<30} {'us/call':>10} {'baseline':>10} {'change':>8} {'limit':>7}")
+    for name, us in results.items():
+        entry = baseline.get(name)
+        if not entry:
+            print(f"{name:<30} {us:>10.2f} {'-':>10} {'-':>8} {'-':>7}")
+            continue
+        threshold = args.threshold if args.threshold is not None else entry["threshold"]
+        change = (us - entry["us_per_call"]) / entry["us_per_call"]
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<30} {us:>10.2f} {entry['us_per_call']:>10.2f} {change:>+8.1%} {threshold:>+7.0%}{flag}")
+        if flag:
+            regressions.append(name)
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) exceeded their threshold: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
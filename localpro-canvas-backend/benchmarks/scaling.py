@@ -0,0 +1,217 @@
+"""
+Throughput of the production launcher as the number of workers grows.
+
+Run from localpro-canvas-backend:
+
+    python -m benchmarks.scaling --mongo url --workers 1,2,4,8
+    python -m benchmarks.scaling --mongo mock --workers 1,2,4
+
+Each worker count starts `python -m app.server` on a local port, drives the
+public read routes over real TCP connections from --clients load processes
+for --duration seconds, then stops the server with SIGTERM. The report shows
+requests per second and how close each count gets to linear scaling.
+
+With --mongo mock every worker gets its own in-memory stand-in seeded with
+the same published portfolios, so the run measures the app's own CPU cost
+per request. Load processes compete with the workers for cores; give the
+server at most half of the machine, or pin the two sides apart, when the
+numbers matter.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import signal
+import socket
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+from app.server import available_cpus
+from benchmarks.harness import create_published_portfolio, create_user, percentile, portfolio_payload
+
+SEEDED = [f"scaling-{i}" for i in range(20)]
+ROUTES = ("public_portfolio", "public_batch", "search_portfolios")
+
+def _mock_app():
+    """The app with a seeded in-memory database installed in every worker's lifespan"""
+    from bson import ObjectId
+    from mongomock_motor import AsyncMongoMockClient
+    from app.database import Database
+    from app.main import _new_portfolio_doc, app
+    from app.models import PortfolioData
+    from app.public_portfolios import public_document
+
+    lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def seeded_lifespan(app):
+        Database.client = AsyncMongoMockClient()
+        Database.db = Database.client["scaling"]
+        Database.public_db = Database.db
+        await Database.create_indexes()
+        for unique_identifier in SEEDED:
+            data = PortfolioData(**portfolio_payload("scaling@example.com", unique_identifier)["data"])
+            portfolio = _new_portfolio_doc(unique_identifier, ObjectId(), "modern", data)
+            portfolio["is_published"] = True
+            await Database.db.portfolios.insert_one(portfolio)
+            await Database.db.public_portfolios.insert_one(public_document(portfolio))
+        async with lifespan(app):
+            yield
+
+    app.router.lifespan_context = seeded_lifespan
+    return app
+
+def __getattr__(name):
+    # Resolved by uvicorn in each spawned worker as benchmarks.scaling:mock_app
+    if name == "mock_app":
+        return _mock_app()
+    raise AttributeError(name)
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(mongo: str, workers: int, port: int) -> subprocess.Popen:
+    if mongo == "mock":
+        code = (
+            "from app.server import serve; "
+            f"serve(app='benchmarks.scaling:mock_app', host='127.0.0.1', port={port}, "
+            f"workers={workers}, create_indexes_first=False, maintenance=False)"
+        )
+        command = [sys.executable, "-c", code]
+    else:
+        command = [sys.executable, "-m", "app.server", "--host", "127.0.0.1",
+                   "--port", str(port), "--workers", str(workers)]
+    return subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+async def wait_ready(base_url: str, workers: int, timeout: float = 60):
+    """Wait until the port answers; spawned workers boot in parallel, so allow them a moment more"""
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get("/")).status_code == 200:
+                    await asyncio.sleep(0.5 * workers)
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"server on {base_url} did not start")
+
+async def seed_url(base_url: str):
+    """Published portfolios to read, created through the API"""
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        email, headers = await create_user(client)
+        return [await create_published_portfolio(client, email, headers, f"Scaling {i}") for i in range(len(SEEDED))]
+
+def load_process(args):
+    """One load generator process; returns (latencies_ms, errors)"""
+    base_url, route, identifiers, connections, duration = args
+
+    async def main():
+        latencies, errors = [], 0
+        deadline = time.perf_counter() + duration
+        limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            async def loop(offset):
+                nonlocal errors
+                i = offset
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    if route == "public_portfolio":
+                        response = await client.get(f"/p/{identifiers[i % len(identifiers)]}")
+                    elif route == "public_batch":
+                        response = await client.post("/p/batch", json={"identifiers": identifiers})
+                    else:
+                        response = await client.get("/search/portfolios", params={"skills": "python,mongodb", "limit": 20})
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    if response.status_code >= 400:
+                        errors += 1
+                    i += 1
+            await asyncio.gather(*(loop(offset) for offset in range(connections)))
+        return latencies, errors
+    return asyncio.run(main())
+
+def measure(pool, base_url, route, identifiers, clients, connections, duration):
+    started = time.perf_counter()
+    results = pool.map(load_process, [(base_url, route, identifiers, connections, duration)] * clients)
+    elapsed = time.perf_counter() - started
+    latencies = [latency for samples, _ in results for latency in samples]
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo", choices=["mock", "url"], default="url")
+    parser.add_argument("--workers", default=None, help="comma-separated worker counts (default: 1,2,4,... up to the cores)")
+    parser.add_argument("--routes", default=",".join(ROUTES))
+    parser.add_argument("--clients", type=int, default=available_cpus(), help="load generator processes")
+    parser.add_argument("--connections", type=int, default=16, help="concurrent connections per load process")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per route and worker count")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    if args.workers:
+        counts = [int(count) for count in args.workers.split(",")]
+    else:
+        counts, count = [], 1
+        while count <= available_cpus():
+            counts.append(count)
+            count *= 2
+    routes = [route for route in args.routes.split(",") if route]
+    unknown = set(routes) - set(ROUTES)
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(sorted(unknown))}")
+
+    results = {}
+    with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+        for workers in counts:
+            port = free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            server = start_server(args.mongo, workers, port)
+            try:
+                asyncio.run(wait_ready(base_url, workers))
+                identifiers = SEEDED if args.mongo == "mock" else asyncio.run(seed_url(base_url))
+                results[workers] = {
+                    route: measure(pool, base_url, route, identifiers, args.clients, args.connections, args.duration)
+                    for route in routes
+                }
+            finally:
+                # The graceful drain path the launcher takes in production
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=60)
+
+    print(f"{'route':<18} {'workers':>7} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7} {'speedup':>8} {'efficiency':>10}")
+    for route in routes:
+        base = results[counts[0]][route]["throughput_rps"] / counts[0]
+        for workers in counts:
+            result = results[workers][route]
+            speedup = result["throughput_rps"] / base if base else 0.0
+            print(f"{route:<18} {workers:>7} {result['throughput_rps']:>9.1f} {result['p50_ms']:>9.2f} "
+                  f"{result['p99_ms']:>9.2f} {result['errors']:>7} {speedup:>7.2f}x {speedup / workers:>9.0%}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "cpus": available_cpus(),
+                "mongo": args.mongo,
+                "clients": args.clients,
+                "connections": args.connections,
+                "duration_s": args.duration,
+                "results": {str(workers): result for workers, result in results.items()},
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+Run with the packages in tests/requirements.txt installed:
+
+    pytest                                   # from localpro-canvas-backend
+    pytest localpro-canvas-backend/tests     # from the repository root
+
+The app runs in-process against an in-memory mongomock-motor database.
+"""
+import os
+import tempfile
+
+# Configuration the app reads on import
+os.environ.setdefault("SECRET_KEY", "test-secret-key-that-is-long-enough-for-hs256")
+os.environ.setdefault("DATABASE_NAME", "tests")
+os.environ.setdefault("SNAPSHOT_DIR", tempfile.mkdtemp(prefix="snapshots-"))
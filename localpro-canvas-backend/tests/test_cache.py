@@ -0,0 +1,45 @@
+"""
+Invalidation of the public portfolio cache while values are being loaded.
+"""
+from app import cache
+from app.cache import PortfolioCache
+
+def _cache():
+    return PortfolioCache(max_bytes=1024 * 1024, ttl_seconds=60)
+
+def test_invalidating_another_key_keeps_the_load():
+    portfolio_cache = _cache()
+    generation = portfolio_cache.generation()
+    portfolio_cache.invalidate("other")
+    portfolio_cache.set("ada", {"views": 1}, generation=generation)
+    assert portfolio_cache.get("ada") == {"views": 1}
+
+def test_invalidating_the_key_drops_the_load():
+    portfolio_cache = _cache()
+    generation = portfolio_cache.generation()
+    portfolio_cache.invalidate("ada")
+    portfolio_cache.set("ada", {"views": 1}, generation=generation)
+    assert portfolio_cache.get("ada") is None
+
+def test_load_started_after_invalidation_is_kept():
+    portfolio_cache = _cache()
+    portfolio_cache.invalidate("ada")
+    generation = portfolio_cache.generation()
+    portfolio_cache.set("ada", {"views": 1}, generation=generation)
+    assert portfolio_cache.get("ada") == {"views": 1}
+
+def test_clear_drops_every_load_in_flight():
+    portfolio_cache = _cache()
+    generation = portfolio_cache.generation()
+    portfolio_cache.clear()
+    portfolio_cache.set("ada", {"views": 1}, generation=generation)
+    assert portfolio_cache.get("ada") is None
+
+def test_forgotten_invalidations_still_drop_older_loads(monkeypatch):
+    monkeypatch.setattr(cache, "PORTFOLIO_CACHE_MAX_TOMBSTONES", 2)
+    portfolio_cache = _cache()
+    generation = portfolio_cache.generation()
+    for key in ("ada", "grace", "linus"):
+        portfolio_cache.invalidate(key)
+    portfolio_cache.set("ada", {"views": 1}, generation=generation)
+    assert portfolio_cache.get("ada") is None
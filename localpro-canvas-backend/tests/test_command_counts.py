@@ -0,0 +1,103 @@
+"""
+MongoDB commands issued per request on the write paths.
+
+mongomock emits no command monitoring events, so each call into a mongomock
+collection counts as one command, the way the driver would send it. Only
+calls made while handling the request are counted, background tasks of the
+request included; the app's periodic tasks run in their own context and are
+left out. Lower a budget when a change saves a round trip; a change that
+needs more must raise it on purpose.
+"""
+import asyncio
+import contextvars
+import functools
+
+import mongomock.collection
+import pytest
+
+from benchmarks.harness import create_user, portfolio_payload, running_app
+
+# Budgets per request, in MongoDB commands
+COMMAND_BUDGETS = {
+    "register": 1,
+    "create_portfolio": 5,
+    "update_portfolio": 6,
+}
+
+# Collection methods that send one command each
+COMMAND_METHODS = (
+    "insert_one", "insert_many", "find", "find_one", "update_one", "update_many",
+    "replace_one", "delete_one", "delete_many", "find_one_and_update",
+    "find_one_and_replace", "find_one_and_delete", "bulk_write", "aggregate",
+    "count_documents", "estimated_document_count", "distinct",
+)
+
+# Commands counted so far by the request in this context, if it is being counted
+_commands = contextvars.ContextVar("commands", default=None)
+# Whether a counted call is running, so calls mongomock makes internally are not counted again
+_in_command = contextvars.ContextVar("in_command", default=False)
+
+def _counting(method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        commands = _commands.get()
+        if commands is None or _in_command.get():
+            return method(*args, **kwargs)
+        commands.append(method.__name__)
+        token = _in_command.set(True)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _in_command.reset(token)
+    return wrapper
+
+@pytest.fixture(autouse=True)
+def count_commands(monkeypatch):
+    for name in COMMAND_METHODS:
+        monkeypatch.setattr(mongomock.collection.Collection, name,
+                            _counting(getattr(mongomock.collection.Collection, name)))
+
+async def _counted(request):
+    """Run one request and return its response and the commands it issued"""
+    commands = []
+    token = _commands.set(commands)
+    try:
+        response = await request
+    finally:
+        _commands.reset(token)
+    return response, commands
+
+def _assert_within_budget(scenario, response, commands):
+    assert response.status_code == 200, response.text
+    assert len(commands) <= COMMAND_BUDGETS[scenario], (
+        f"{scenario} issued {len(commands)} MongoDB commands, budget is "
+        f"{COMMAND_BUDGETS[scenario]}: {commands}"
+    )
+
+def test_register_commands():
+    async def scenario():
+        async with running_app("mock") as client:
+            return await _counted(client.post("/register", json={
+                "email": "register@example.com", "password": "Password123"
+            }))
+    _assert_within_budget("register", *asyncio.run(scenario()))
+
+def test_create_portfolio_commands():
+    async def scenario():
+        async with running_app("mock") as client:
+            email, headers = await create_user(client)
+            return await _counted(client.post("/portfolios", headers=headers, json=portfolio_payload(email)))
+    _assert_within_budget("create_portfolio", *asyncio.run(scenario()))
+
+def test_update_portfolio_commands():
+    async def scenario():
+        async with running_app("mock") as client:
+            email, headers = await create_user(client)
+            created = await client.post("/portfolios", headers=headers, json=portfolio_payload(email))
+            unique_identifier = created.json()["data"]["unique_identifier"]
+            payload = portfolio_payload(email, "Updated User")
+            return await _counted(client.put(
+                f"/portfolios/{unique_identifier}", headers=headers,
+                json={"data": payload["data"], "is_published": True}
+            ))
+    _assert_within_budget("update_portfolio", *asyncio.run(scenario()))
@@ -0,0 +1,52 @@
+"""
+Portfolio identifiers stay unique when many tasks and workers allocate at
+once, against an in-memory mongomock-motor database.
+"""
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from app.database import Database
+from app.identifiers import IdentifierAllocator, format_identifier
+
+class SlowLeaseAllocator(IdentifierAllocator):
+    """Suspends before each lease, as a network round trip would, so other tasks queue on the lock"""
+
+    leases = 0
+
+    async def _lease(self):
+        SlowLeaseAllocator.leases += 1
+        await asyncio.sleep(0)
+        await super()._lease()
+
+def test_concurrent_allocation_never_repeats_an_identifier():
+    allocators, tasks, per_task, block_size = 4, 16, 50, 7
+
+    async def scenario():
+        Database.db = AsyncMongoMockClient()["identifiers"]
+        # Each allocator stands in for one app worker sharing the counter
+        instances = [SlowLeaseAllocator(block_size) for _ in range(allocators)]
+
+        async def task(allocator):
+            identifiers = []
+            for _ in range(per_task):
+                identifiers.append(await allocator.allocate("Jane Doe"))
+                await asyncio.sleep(0)
+            return identifiers
+        results = await asyncio.gather(*(task(allocator) for allocator in instances for _ in range(tasks)))
+        return [identifier for identifiers in results for identifier in identifiers]
+
+    SlowLeaseAllocator.leases = 0
+    identifiers = asyncio.run(scenario())
+    total = allocators * tasks * per_task
+    assert len(identifiers) == total
+    assert len(set(identifiers)) == total
+    # Tasks waiting on the lock reuse the block another task leased
+    assert SlowLeaseAllocator.leases <= total // block_size + allocators
+
+def test_different_counters_never_share_an_identifier():
+    # Hyphens in the slug cannot make one counter's identifier look like another's
+    names = ["Jane Doe", "Jane-Doe", "jane doe 1", "Jane Doe-1", "", "---"]
+    identifiers = {format_identifier(name, number) for name in names for number in range(200)}
+    suffixes = {identifier.rsplit("-", 1)[1] for identifier in identifiers}
+    assert len(suffixes) == 200
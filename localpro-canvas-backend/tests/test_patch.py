@@ -0,0 +1,116 @@
+"""
+Translation of merge and JSON patches into MongoDB updates, and the PATCH
+endpoint applying them, against an in-memory mongomock-motor database.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.database import db
+from app.patch import json_patch_update, merge_patch_update
+from benchmarks.harness import create_user, portfolio_payload, running_app
+
+def test_merge_patch_sets_touched_fields():
+    update, conditions = merge_patch_update({"data": {"about": "New", "hobbies": ["Go"]}, "is_published": True})
+    assert update == {"$set": {"data.about": "New", "data.hobbies": ["Go"], "is_published": True}}
+    assert conditions == {}
+
+def test_replace_requires_the_element():
+    update, conditions = json_patch_update([{"op": "replace", "path": "/data/skills/10", "value": "Go"}])
+    assert update == {"$set": {"data.skills.10": "Go"}}
+    assert conditions == {"data.skills.10": {"$exists": True}}
+
+def test_insert_requires_the_previous_element():
+    update, conditions = json_patch_update([{"op": "add", "path": "/data/skills/3", "value": "Go"}])
+    assert update == {"$push": {"data.skills": {"$each": ["Go"], "$position": 3}}}
+    assert conditions == {"data.skills.2": {"$exists": True}}
+
+def test_insert_at_start_and_append_need_no_element():
+    for path, push in (("/data/skills/0", {"$each": ["Go"], "$position": 0}), ("/data/skills/-", {"$each": ["Go"]})):
+        update, conditions = json_patch_update([{"op": "add", "path": path, "value": "Go"}])
+        assert update == {"$push": {"data.skills": push}}
+        assert conditions == {}
+
+def test_test_condition_is_kept_over_existence():
+    for operations in (
+        [{"op": "test", "path": "/data/skills/1", "value": "Go"},
+         {"op": "replace", "path": "/data/skills/1", "value": "Rust"}],
+        [{"op": "replace", "path": "/data/skills/1", "value": "Rust"},
+         {"op": "test", "path": "/data/skills/1", "value": "Go"}],
+    ):
+        _, conditions = json_patch_update(operations)
+        assert conditions == {"data.skills.1": "Go"}
+
+def test_remove_pulls_a_unique_tested_value():
+    update, conditions = json_patch_update([
+        {"op": "test", "path": "/data/skills/1", "value": "Go"},
+        {"op": "remove", "path": "/data/skills/1"},
+    ])
+    assert update == {"$pull": {"data.skills": "Go"}}
+    assert conditions["data.skills.1"] == "Go"
+    assert len(conditions["$expr"]["$and"]) == 1
+
+@pytest.mark.parametrize("operations", [
+    [{"op": "remove", "path": "/data/skills/1"}],
+    [{"op": "replace", "path": "/data/skills/-", "value": "Go"}],
+    [{"op": "add", "path": "/data/skills/01", "value": "Go"}],
+    [{"op": "move", "from": "/data/skills/0", "path": "/data/skills/1"}],
+    [{"op": "add", "path": "/data/skills/-", "value": "Go"},
+     {"op": "replace", "path": "/data/skills/0", "value": "Rust"}],
+])
+def test_unsupported_patches_are_rejected(operations):
+    with pytest.raises(HTTPException) as raised:
+        json_patch_update(operations)
+    assert raised.value.status_code == 400
+
+async def _patch_skills(operations):
+    """Apply a JSON patch to a portfolio with skills Python, MongoDB, FastAPI"""
+    async with running_app("mock") as client:
+        email, headers = await create_user(client)
+        created = await client.post("/portfolios", headers=headers, json=portfolio_payload(email))
+        unique_identifier = created.json()["data"]["unique_identifier"]
+        response = await client.patch(
+            f"/portfolios/{unique_identifier}", json=operations,
+            headers={**headers, "Content-Type": "application/json-patch+json"}
+        )
+        portfolio = await db.db.portfolios.find_one({"unique_identifier": unique_identifier})
+        return response, portfolio
+
+@pytest.mark.parametrize("operations", [
+    [{"op": "replace", "path": "/data/skills/10", "value": "Go"}],
+    [{"op": "add", "path": "/data/skills/5", "value": "Go"}],
+    [{"op": "test", "path": "/data/skills/3", "value": "Go"}, {"op": "remove", "path": "/data/skills/3"}],
+])
+def test_out_of_range_index_fails_without_writing(operations):
+    response, portfolio = asyncio.run(_patch_skills(operations))
+    assert response.status_code == 412, response.text
+    assert portfolio["data"]["skills"] == ["Python", "MongoDB", "FastAPI"]
+    assert portfolio["revision"] == 1
+
+@pytest.mark.parametrize("operations, skills", [
+    ([{"op": "replace", "path": "/data/skills/2", "value": "Go"}], ["Python", "MongoDB", "Go"]),
+    ([{"op": "add", "path": "/data/skills/3", "value": "Go"}], ["Python", "MongoDB", "FastAPI", "Go"]),
+    ([{"op": "add", "path": "/data/skills/0", "value": "Go"}], ["Go", "Python", "MongoDB", "FastAPI"]),
+])
+def test_in_range_index_is_applied(operations, skills):
+    response, portfolio = asyncio.run(_patch_skills(operations))
+    assert response.status_code == 200, response.text
+    assert portfolio["data"]["skills"] == skills
+    assert portfolio["revision"] == 2
+
+def test_patch_writes_normalized_skills_with_the_change():
+    response, portfolio = asyncio.run(_patch_skills([
+        {"op": "replace", "path": "/data/skills/1", "value": "  Machine   Learning "},
+        {"op": "add", "path": "/data/hobbies/-", "value": "Go"},
+    ]))
+    assert response.status_code == 200, response.text
+    assert portfolio["skills_normalized"] == ["fastapi", "machine learning", "python"]
+
+def test_patch_succeeds_when_the_read_model_sync_fails(monkeypatch):
+    async def failing_sync(portfolio):
+        raise RuntimeError("read model unavailable")
+    monkeypatch.setattr("app.main.sync_public_portfolio", failing_sync)
+    response, portfolio = asyncio.run(_patch_skills([{"op": "add", "path": "/data/skills/-", "value": "Go"}]))
+    assert response.status_code == 200, response.text
+    assert portfolio["skills_normalized"] == ["fastapi", "go", "mongodb", "python"]
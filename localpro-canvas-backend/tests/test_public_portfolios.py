@@ -0,0 +1,62 @@
+"""
+Keeping the public_portfolios read model in line with the owners' portfolios,
+against an in-memory mongomock-motor database.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from app.database import db
+from app.public_portfolios import remove_orphaned_public_portfolios
+from benchmarks.harness import create_published_portfolio, create_user, running_app
+
+def test_failed_delete_keeps_the_portfolio_for_a_retry(monkeypatch):
+    from app import main
+    remove = main.remove_public_portfolio
+    calls = []
+
+    async def failing_once(unique_identifier):
+        calls.append(unique_identifier)
+        if len(calls) == 1:
+            raise RuntimeError("read model unavailable")
+        await remove(unique_identifier)
+    monkeypatch.setattr(main, "remove_public_portfolio", failing_once)
+
+    async def scenario():
+        async with running_app("mock") as client:
+            email, headers = await create_user(client)
+            unique_identifier = await create_published_portfolio(client, email, headers)
+            statuses = [
+                (await client.delete(f"/portfolios/{unique_identifier}", headers=headers)).status_code
+                for _ in range(2)
+            ]
+            return statuses, (await client.get(f"/p/{unique_identifier}")).status_code
+    statuses, public_status = asyncio.run(scenario())
+    assert statuses == [500, 200]
+    assert public_status == 404
+
+def test_orphaned_public_copies_are_removed():
+    async def scenario():
+        async with running_app("mock") as client:
+            email, headers = await create_user(client)
+            kept = await create_published_portfolio(client, email, headers)
+            old = datetime.utcnow() - timedelta(minutes=1)
+            await db.db.public_portfolios.insert_many([
+                {"_id": "deleted", "updated_at": old},
+                # Copied after the scan started, by a publish the scan did not see
+                {"_id": "just-published", "updated_at": datetime.utcnow() + timedelta(minutes=1)},
+            ])
+            await remove_orphaned_public_portfolios()
+            return kept, sorted([document["_id"] async for document in db.db.public_portfolios.find({}, {"_id": 1})])
+    kept, remaining = asyncio.run(scenario())
+    assert remaining == sorted([kept, "just-published"])
+
+def test_saving_keeps_the_public_view_count():
+    async def scenario():
+        async with running_app("mock") as client:
+            email, headers = await create_user(client)
+            unique_identifier = await create_published_portfolio(client, email, headers)
+            # Flushed to the public copy while the owner's write was in flight
+            await db.db.public_portfolios.update_one({"_id": unique_identifier}, {"$inc": {"views": 7}})
+            await client.put(f"/portfolios/{unique_identifier}", headers=headers, json={"is_published": True})
+            return (await db.db.public_portfolios.find_one({"_id": unique_identifier}))["views"]
+    assert asyncio.run(scenario()) == 7
@@ -0,0 +1,84 @@
+"""
+Revision deltas: recording them from patch updates and replaying them,
+against an in-memory mongomock-motor database.
+"""
+import asyncio
+import copy
+
+from mongomock_motor import AsyncMongoMockClient
+
+from app.database import Database
+from app.patch import json_patch_update
+from app.revisions import (
+    DELTA, SNAPSHOT, apply_changes, diff_content, read_revision, update_changes
+)
+from benchmarks.harness import create_user, portfolio_payload, running_app
+
+CONTENT = {"data": {"name": "Ada", "skills": ["Python", "Go", "Python"]}, "is_published": False}
+
+def test_set_past_the_end_pads_like_mongodb():
+    content = apply_changes(copy.deepcopy(CONTENT), [{"op": "set", "path": "data.skills.5", "value": "Rust"}])
+    assert content["data"]["skills"] == ["Python", "Go", "Python", None, None, "Rust"]
+
+def test_pull_removes_one_occurrence():
+    content = apply_changes(copy.deepcopy(CONTENT), [{"op": "pull", "path": "data.skills", "value": "Python"}])
+    assert content["data"]["skills"] == ["Go", "Python"]
+
+def test_patch_update_replays_to_the_patched_content():
+    update, _ = json_patch_update([
+        {"op": "add", "path": "/data/skills/1", "value": "Rust"},
+        {"op": "replace", "path": "/data/name", "value": "Grace"},
+        {"op": "replace", "path": "/is_published", "value": True},
+    ])
+    content = apply_changes(copy.deepcopy(CONTENT), update_changes(update))
+    assert content == {"data": {"name": "Grace", "skills": ["Python", "Rust", "Go", "Python"]}, "is_published": True}
+
+def test_diff_replays_to_the_new_content():
+    new = {"data": {"name": "Ada", "skills": ["Go", "Rust"], "about": "Hi"}, "is_published": True}
+    assert apply_changes(copy.deepcopy(CONTENT), diff_content(CONTENT, new)) == new
+
+async def _read_revisions(revisions, numbers):
+    Database.db = AsyncMongoMockClient()["revisions"]
+    await Database.db.portfolio_revisions.insert_many([
+        {"unique_identifier": "ada", "action": "update", "created_at": None, **revision}
+        for revision in revisions
+    ])
+    return [await read_revision("ada", number) for number in numbers]
+
+def test_read_revision_replays_deltas_after_the_snapshot():
+    first, third = asyncio.run(_read_revisions([
+        {"number": 1, "kind": SNAPSHOT, "content": CONTENT},
+        {"number": 2, "kind": DELTA, "changes": [{"op": "set", "path": "data.name", "value": "Grace"}]},
+        {"number": 3, "kind": DELTA, "changes": [{"op": "pull", "path": "data.skills", "value": "Go"}]},
+    ], [1, 3]))
+    assert first["data"] == CONTENT["data"]
+    assert third["number"] == 3
+    assert third["data"] == {"name": "Grace", "skills": ["Python", "Python"]}
+
+def test_read_revision_stops_at_a_gap():
+    second, fourth = asyncio.run(_read_revisions([
+        {"number": 1, "kind": SNAPSHOT, "content": CONTENT},
+        {"number": 2, "kind": DELTA, "changes": [{"op": "set", "path": "data.name", "value": "Grace"}]},
+        {"number": 4, "kind": DELTA, "changes": [{"op": "set", "path": "data.name", "value": "Ada"}]},
+    ], [2, 4]))
+    assert second["data"]["name"] == "Grace"
+    assert fourth is None
+
+def test_rejected_patch_leaves_no_gap_in_history():
+    async def scenario():
+        async with running_app("mock") as client:
+            email, headers = await create_user(client)
+            created = await client.post("/portfolios", headers=headers, json=portfolio_payload(email))
+            unique_identifier = created.json()["data"]["unique_identifier"]
+            headers = {**headers, "Content-Type": "application/json-patch+json"}
+            statuses = []
+            for operations in (
+                [{"op": "replace", "path": "/data/skills/10", "value": "Go"}],
+                [{"op": "replace", "path": "/data/skills/0", "value": "Go"}],
+            ):
+                response = await client.patch(f"/portfolios/{unique_identifier}", json=operations, headers=headers)
+                statuses.append(response.status_code)
+            return statuses, await read_revision(unique_identifier, 2)
+    statuses, revision = asyncio.run(scenario())
+    assert statuses == [412, 200]
+    assert revision["data"]["skills"] == ["Go", "MongoDB", "FastAPI"]
@@ -0,0 +1,77 @@
+"""
+Public search over the public_portfolios read model, against an in-memory
+mongomock-motor database. mongomock has no $text support, so the
+relevance-ranked path is only covered up to its cursor.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.database import db
+from app.pagination import decode_cursor, decode_offset_cursor, encode_offset_cursor
+from app.public_portfolios import backfill_public_portfolios
+from benchmarks.harness import create_published_portfolio, create_user, portfolio_payload, running_app
+
+async def _published(client, count):
+    email, headers = await create_user(client)
+    identifiers = [await create_published_portfolio(client, email, headers, f"Search {i}") for i in range(count)]
+    # An unpublished portfolio never shows up
+    await client.post("/portfolios", headers=headers, json=portfolio_payload(email, "Draft"))
+    return identifiers
+
+def test_browsing_pages_newest_first():
+    async def scenario():
+        async with running_app("mock") as client:
+            identifiers = await _published(client, 5)
+            pages, cursor = [], None
+            while True:
+                params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+                page = (await client.get("/search/portfolios", params=params)).json()
+                pages.append([item["unique_identifier"] for item in page["items"]])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    return identifiers, pages
+    identifiers, pages = asyncio.run(scenario())
+    newest_first = list(reversed(identifiers))
+    assert pages == [newest_first[0:2], newest_first[2:4], newest_first[4:5]]
+
+def test_skill_filter_uses_normalized_skills():
+    async def scenario():
+        async with running_app("mock") as client:
+            email, headers = await create_user(client)
+            payload = portfolio_payload(email, "Rustacean")
+            payload["data"]["skills"] = ["  Rust ", "Go"]
+            created = await client.post("/portfolios", headers=headers, json=payload)
+            unique_identifier = created.json()["data"]["unique_identifier"]
+            await client.put(f"/portfolios/{unique_identifier}", headers=headers, json={"is_published": True})
+            await _published(client, 2)
+            page = (await client.get("/search/portfolios", params={"skills": "rust,GO"})).json()
+            return unique_identifier, [item["unique_identifier"] for item in page["items"]]
+    unique_identifier, found = asyncio.run(scenario())
+    assert found == [unique_identifier]
+
+def test_backfill_adds_search_fields_to_older_copies():
+    async def scenario():
+        async with running_app("mock") as client:
+            [unique_identifier] = await _published(client, 1)
+            await db.db.public_portfolios.update_one(
+                {"_id": unique_identifier}, {"$unset": {"portfolio_id": "", "skills_normalized": ""}}
+            )
+            await backfill_public_portfolios()
+            owner = await db.db.portfolios.find_one({"unique_identifier": unique_identifier})
+            public = await db.db.public_portfolios.find_one({"_id": unique_identifier})
+            return owner, public
+    owner, public = asyncio.run(scenario())
+    assert public["portfolio_id"] == owner["_id"]
+    assert public["skills_normalized"] == owner["skills_normalized"]
+
+def test_offset_cursor_round_trips():
+    assert decode_offset_cursor(encode_offset_cursor(40)) == 40
+    assert decode_offset_cursor(None) == 0
+
+def test_cursor_kinds_are_not_interchangeable():
+    with pytest.raises(HTTPException):
+        decode_cursor(encode_offset_cursor(40))
+    with pytest.raises(HTTPException):
+        decode_offset_cursor("not-a-cursor")
@@ -0,0 +1,32 @@
+"""
+Serving pre-rendered snapshots, against an in-memory mongomock-motor database.
+"""
+import asyncio
+
+import pytest
+
+from benchmarks.harness import create_published_portfolio, create_user, running_app
+
+async def _snapshot_statuses(if_none_match):
+    async with running_app("mock") as client:
+        email, headers = await create_user(client)
+        unique_identifier = await create_published_portfolio(client, email, headers)
+        first = await client.get(f"/snapshots/modern/{unique_identifier}")
+        etag = first.headers["ETag"]
+        revalidated = await client.get(
+            f"/snapshots/modern/{unique_identifier}",
+            headers={"If-None-Match": if_none_match(etag)}
+        )
+        return first.status_code, revalidated.status_code
+
+@pytest.mark.parametrize("if_none_match", [
+    lambda etag: etag,
+    lambda etag: "W/" + etag,
+    lambda etag: f'"other", {etag}',
+    lambda etag: "*",
+])
+def test_matching_etag_is_not_modified(if_none_match):
+    assert asyncio.run(_snapshot_statuses(if_none_match)) == (200, 304)
+
+def test_other_etag_gets_the_snapshot():
+    assert asyncio.run(_snapshot_statuses(lambda etag: '"other"')) == (200, 200)
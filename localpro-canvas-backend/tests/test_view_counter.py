@@ -0,0 +1,22 @@
+"""
+Buffered view counts reaching both portfolio collections, against an
+in-memory mongomock-motor database.
+"""
+import asyncio
+
+from app.database import db
+from app.view_counter import view_counter
+from benchmarks.harness import create_published_portfolio, create_user, running_app
+
+def test_flush_writes_views_to_both_collections():
+    async def scenario():
+        async with running_app("mock") as client:
+            email, headers = await create_user(client)
+            unique_identifier = await create_published_portfolio(client, email, headers)
+            for _ in range(3):
+                assert (await client.get(f"/p/{unique_identifier}")).status_code == 200
+            await view_counter.flush()
+            owner = await db.db.portfolios.find_one({"unique_identifier": unique_identifier})
+            public = await db.db.public_portfolios.find_one({"_id": unique_identifier})
+            return owner["views"], public["views"], view_counter.unflushed(unique_identifier)
+    assert asyncio.run(scenario()) == (3, 3, 0)